@@ -15,6 +15,7 @@ from services.data_service import DataService
 from services.room_manager import RoomManager, MonitoredRoom
 from services.scheduler_service import SchedulerService
 from api.rooms import init_rooms_api
+from utils import json_codec
 from utils.logger import get_logger
 from utils.status_display import StatusDisplay
 
@@ -30,7 +31,8 @@ socketio = SocketIO(
     app,
     cors_allowed_origins=config.SOCKETIO_CORS_ALLOWED_ORIGINS,
     logger=config.SOCKETIO_LOGGER,
-    engineio_logger=config.SOCKETIO_ENGINEIO_LOGGER
+    engineio_logger=config.SOCKETIO_ENGINEIO_LOGGER,
+    json=json_codec
 )
 
 # 初始化服务
@@ -193,7 +195,7 @@ def handle_join(data):
             room = data_service.get_live_room(live_id)
             room_status = room.status if room else None
 
-            emit(f'room_{live_id}_stats', {
+            emit(monitored_room.stats_channel, {
                 'room_status': room_status,
                 'current_user_count': monitored_room.stats['current_user_count'],
                 'total_user_count': monitored_room.stats['total_user_count'],
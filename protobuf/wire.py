@@ -0,0 +1,236 @@
+"""
+protobuf 线格式轻量读写
+只解析推送外层 PushFrame / Response / Message 中用到的字段，其余字段按长度直接跳过，
+避免 betterproto 对整帧做逐字段反序列化。内层的统计、控制消息只用到一两个标量字段，也在这里按字段号直接读取；
+弹幕、礼物等字段多的消息仍交给 douyin_pb2 解析。
+ACK 帧结构固定，直接按线格式拼接字节。
+"""
+
+# 线格式类型
+_WT_VARINT = 0
+_WT_FIXED64 = 1
+_WT_LEN = 2
+_WT_FIXED32 = 5
+
+# PushFrame 字段号
+_PF_LOG_ID = 2
+_PF_PAYLOAD_TYPE = 7
+_PF_PAYLOAD = 8
+
+# Response 字段号
+_RESP_MESSAGES = 1
+_RESP_INTERNAL_EXT = 5
+_RESP_NEED_ACK = 9
+
+# Message 字段号
+_MSG_METHOD = 1
+_MSG_PAYLOAD = 2
+
+# RoomUserSeqMessage 字段号（只读 total 和 totalPvForAnchor，榜单/座位等嵌套字段整段跳过）
+_SEQ_TOTAL = 3
+_SEQ_TOTAL_PV_FOR_ANCHOR = 11
+
+# ControlMessage 字段号
+_CTRL_STATUS = 2
+
+_INT64_SIGN = 1 << 63
+_UINT64_RANGE = 1 << 64
+
+# ACK 帧的固定部分：PushFrame.log_id 的 tag，以及 payload_type='ack' 字段的完整编码
+_ACK_TAG_LOG_ID = bytes([_PF_LOG_ID << 3 | _WT_VARINT])
+_ACK_PAYLOAD_TYPE = bytes([_PF_PAYLOAD_TYPE << 3 | _WT_LEN, 3]) + b'ack'
+_ACK_TAG_PAYLOAD = bytes([_PF_PAYLOAD << 3 | _WT_LEN])
+
+
+def read_varint(buf, pos: int):
+    """从 pos 处读取一个 varint，返回 (值, 新位置)"""
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    result = b & 0x7F
+    shift = 7
+    pos += 1
+    while True:
+        b = buf[pos]
+        result |= (b & 0x7F) << shift
+        pos += 1
+        if b < 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise ValueError("varint 过长")
+
+
+def encode_varint(value: int) -> bytes:
+    """把非负整数编码为 varint"""
+    if value < 0x80:
+        return bytes((value,))
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def skip_field(buf, pos: int, wire_type: int) -> int:
+    """跳过一个字段的值，返回下一个 tag 的位置"""
+    if wire_type == _WT_VARINT:
+        return read_varint(buf, pos)[1]
+    if wire_type == _WT_LEN:
+        length, pos = read_varint(buf, pos)
+        return pos + length
+    if wire_type == _WT_FIXED64:
+        return pos + 8
+    if wire_type == _WT_FIXED32:
+        return pos + 4
+    raise ValueError(f"不支持的线格式类型: {wire_type}")
+
+
+def parse_push_frame(data: bytes):
+    """
+    解析 PushFrame
+    :return: (log_id, payload_type, payload)
+    """
+    log_id = 0
+    payload_type = ''
+    payload = b''
+    pos = 0
+    end = len(data)
+    while pos < end:
+        tag, pos = read_varint(data, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if field == _PF_PAYLOAD and wire_type == _WT_LEN:
+            length, pos = read_varint(data, pos)
+            payload = data[pos:pos + length]
+            pos += length
+        elif field == _PF_LOG_ID and wire_type == _WT_VARINT:
+            log_id, pos = read_varint(data, pos)
+        elif field == _PF_PAYLOAD_TYPE and wire_type == _WT_LEN:
+            length, pos = read_varint(data, pos)
+            payload_type = data[pos:pos + length].decode('utf-8')
+            pos += length
+        else:
+            pos = skip_field(data, pos, wire_type)
+    return log_id, payload_type, payload
+
+
+def parse_response(data: bytes):
+    """
+    解析 Response，消息列表只记录位置，不解码内容
+    :return: (messages, internal_ext, need_ack)，messages 为 Message 字段的 (起点, 终点) 列表；
+             internal_ext 保持原始字节，只用于原样回传 ACK，不做 utf-8 解码
+    """
+    messages = []
+    internal_ext = b''
+    need_ack = False
+    pos = 0
+    end = len(data)
+    while pos < end:
+        tag, pos = read_varint(data, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if field == _RESP_MESSAGES and wire_type == _WT_LEN:
+            length, pos = read_varint(data, pos)
+            messages.append((pos, pos + length))
+            pos += length
+        elif field == _RESP_INTERNAL_EXT and wire_type == _WT_LEN:
+            length, pos = read_varint(data, pos)
+            internal_ext = data[pos:pos + length]
+            pos += length
+        elif field == _RESP_NEED_ACK and wire_type == _WT_VARINT:
+            value, pos = read_varint(data, pos)
+            need_ack = bool(value)
+        else:
+            pos = skip_field(data, pos, wire_type)
+    return messages, internal_ext, need_ack
+
+
+def read_message_method(data: bytes, start: int, end: int):
+    """
+    读取 Message 的 method 字段（不做 utf-8 解码，便于调用方直接按字节查表过滤）
+    :return: (method 原始字节, payload 的起止位置)，payload 不存在时位置为 None
+    """
+    method = b''
+    span = None
+    pos = start
+    while pos < end:
+        tag, pos = read_varint(data, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if field == _MSG_METHOD and wire_type == _WT_LEN:
+            length, pos = read_varint(data, pos)
+            method = data[pos:pos + length]
+            pos += length
+        elif field == _MSG_PAYLOAD and wire_type == _WT_LEN:
+            length, pos = read_varint(data, pos)
+            span = (pos, pos + length)
+            pos += length
+        else:
+            pos = skip_field(data, pos, wire_type)
+        if method and span:
+            # 两个需要的字段都已读到，其余字段不再扫描
+            break
+    return method, span
+
+
+def _to_signed(value: int) -> int:
+    """把 varint 读出的无符号值按 int64 / int32 解释（负数按 64 位补码编码）"""
+    return value - _UINT64_RANGE if value >= _INT64_SIGN else value
+
+
+def parse_room_user_seq(data: bytes):
+    """
+    解析 RoomUserSeqMessage 中用到的字段
+    :return: (total, total_pv_for_anchor)，未设置时为 (0, '')，与 protobuf 默认值一致
+    """
+    total = 0
+    total_pv_for_anchor = ''
+    pos = 0
+    end = len(data)
+    while pos < end:
+        tag, pos = read_varint(data, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if field == _SEQ_TOTAL and wire_type == _WT_VARINT:
+            total, pos = read_varint(data, pos)
+            total = _to_signed(total)
+        elif field == _SEQ_TOTAL_PV_FOR_ANCHOR and wire_type == _WT_LEN:
+            length, pos = read_varint(data, pos)
+            total_pv_for_anchor = data[pos:pos + length].decode('utf-8')
+            pos += length
+        else:
+            pos = skip_field(data, pos, wire_type)
+    return total, total_pv_for_anchor
+
+
+def parse_control_status(data: bytes) -> int:
+    """解析 ControlMessage 的 status 字段，未设置时为 0"""
+    status = 0
+    pos = 0
+    end = len(data)
+    while pos < end:
+        tag, pos = read_varint(data, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if field == _CTRL_STATUS and wire_type == _WT_VARINT:
+            status, pos = read_varint(data, pos)
+            status = _to_signed(status)
+        else:
+            pos = skip_field(data, pos, wire_type)
+    return status
+
+
+def encode_ack_frame(log_id: int, internal_ext: bytes) -> bytes:
+    """
+    编码 ACK 用的 PushFrame，与 PushFrame(log_id=..., payload_type='ack', payload=...) 序列化结果一致
+    （字段按编号升序，默认值字段省略）
+    :param internal_ext: parse_response 返回的原始字节
+    """
+    parts = []
+    if log_id:
+        parts.append(_ACK_TAG_LOG_ID)
+        parts.append(encode_varint(log_id))
+    parts.append(_ACK_PAYLOAD_TYPE)
+    payload = internal_ext
+    if payload:
+        parts.append(_ACK_TAG_PAYLOAD)
+        parts.append(encode_varint(len(payload)))
+        parts.append(payload)
+    return b''.join(parts)
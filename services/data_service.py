@@ -2,9 +2,10 @@
 数据服务层
 封装所有数据库操作
 """
+import threading
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine, and_, or_, func, text
+from sqlalchemy import create_engine, and_, or_, func, text, update
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.exc import IntegrityError
 
@@ -35,6 +36,8 @@ class DataService:
             autoflush=False,
             bind=self.engine
         ))
+        # 直播间记录（状态、错误信息、主播名等）写入后置位，用于唤醒终端状态面板
+        self.room_changed = threading.Event()
 
     def create_tables(self):
         """创建所有数据库表"""
@@ -67,6 +70,7 @@ class DataService:
             session.add(room)
             session.commit()
             session.refresh(room)
+            self.room_changed.set()
             return room
         except IntegrityError:
             session.rollback()
@@ -119,6 +123,7 @@ class DataService:
                         setattr(room, key, value)
                 room.updated_at = get_china_now()
                 session.commit()
+                self.room_changed.set()
                 return True
             return False
         finally:
@@ -148,6 +153,7 @@ class DataService:
             if room:
                 session.delete(room)
                 session.commit()
+                self.room_changed.set()
                 return True
             return False
         finally:
@@ -352,44 +358,20 @@ class DataService:
                 )
             ).first()
 
-            if contribution:
-                contribution.total_score += gift_value
-                contribution.gift_count += gift_count
-                contribution.chat_count += chat_count
-                if user_avatar:
-                    contribution.user_avatar = user_avatar
-                contribution.user_name = user_name  # 更新用户名
-                if anchor_name:
-                    contribution.anchor_name = anchor_name  # 更新主播名
-                # 更新用户额外信息（只在有值时更新）
-                if gender is not None and gender > 0:
-                    contribution.gender = gender
-                if follower_count is not None and follower_count > 0:
-                    contribution.follower_count = follower_count
-                if following_count is not None and following_count > 0:
-                    contribution.following_count = following_count
-                if age_range is not None and age_range > 0:
-                    contribution.age_range = age_range
-                if fans_club_level is not None and fans_club_level > 0:
-                    contribution.fans_club_level = fans_club_level
-                contribution.updated_at = get_china_now()
-            else:
-                contribution = UserContribution(
-                    live_id=live_id,
-                    anchor_name=anchor_name,
-                    user_id=user_id,
-                    user_name=user_name,
-                    total_score=gift_value,
-                    gift_count=gift_count,
-                    chat_count=chat_count,
-                    user_avatar=user_avatar,
-                    gender=gender if gender and gender > 0 else None,
-                    follower_count=follower_count if follower_count and follower_count > 0 else None,
-                    following_count=following_count if following_count and following_count > 0 else None,
-                    age_range=age_range if age_range and age_range > 0 else None,
-                    fans_club_level=fans_club_level if fans_club_level and fans_club_level > 0 else 0
-                )
-                session.add(contribution)
+            contribution = self._apply_user_contribution(
+                session, contribution, live_id, user_id,
+                user_name=user_name,
+                anchor_name=anchor_name,
+                gift_value=gift_value,
+                gift_count=gift_count,
+                chat_count=chat_count,
+                user_avatar=user_avatar,
+                gender=gender,
+                follower_count=follower_count,
+                following_count=following_count,
+                age_range=age_range,
+                fans_club_level=fans_club_level
+            )
 
             session.commit()
             session.refresh(contribution)
@@ -401,6 +383,104 @@ class DataService:
         finally:
             session.close()
 
+    def bulk_update_user_contributions(self, live_id: str, contributions: Dict[str, Dict]) -> bool:
+        """
+        批量更新用户贡献（一次事务），每个用户的语义与 update_user_contribution 相同
+        :param contributions: {user_id: 合并后的增量}，字段为 update_user_contribution 的同名参数
+                              （gift_value / gift_count / chat_count 为累加值，其余为最新值）
+        :return: 是否整批写入成功
+        """
+        if not contributions:
+            return True
+        session = self.get_session()
+        try:
+            user_ids = list(contributions)
+            existing = {}
+            # 分批 IN 查询，避免超出 SQLite 的参数个数上限
+            for i in range(0, len(user_ids), 500):
+                for contribution in session.query(UserContribution).filter(
+                    UserContribution.live_id == live_id,
+                    UserContribution.user_id.in_(user_ids[i:i + 500])
+                ):
+                    existing[contribution.user_id] = contribution
+
+            for user_id, fields in contributions.items():
+                self._apply_user_contribution(session, existing.get(user_id), live_id, user_id, **fields)
+
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"批量更新用户贡献失败，改为逐条写入: {e}")
+        finally:
+            session.close()
+
+        # 整批失败（如 uq_room_user 唯一约束冲突）时逐条写入，只丢弃出错的那一条
+        session = self.get_session()
+        try:
+            for user_id, fields in contributions.items():
+                try:
+                    contribution = session.query(UserContribution).filter(
+                        UserContribution.live_id == live_id,
+                        UserContribution.user_id == user_id
+                    ).first()
+                    self._apply_user_contribution(session, contribution, live_id, user_id, **fields)
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    logger.error(f"更新用户贡献失败: user_id={user_id}, {e}")
+            return False
+        finally:
+            session.close()
+
+    @staticmethod
+    def _apply_user_contribution(session, contribution: Optional[UserContribution], live_id: str, user_id: str,
+                                 user_name: str, anchor_name: str = None, gift_value: float = 0,
+                                 gift_count: int = 0, chat_count: int = 0, user_avatar: str = None,
+                                 gender: int = None, follower_count: int = None,
+                                 following_count: int = None, age_range: int = None,
+                                 fans_club_level: int = None) -> UserContribution:
+        """把一次贡献增量合并到已有记录，记录不存在时新建并加入会话（不提交）"""
+        if contribution:
+            contribution.total_score += gift_value
+            contribution.gift_count += gift_count
+            contribution.chat_count += chat_count
+            if user_avatar:
+                contribution.user_avatar = user_avatar
+            contribution.user_name = user_name  # 更新用户名
+            if anchor_name:
+                contribution.anchor_name = anchor_name  # 更新主播名
+            # 更新用户额外信息（只在有值时更新）
+            if gender is not None and gender > 0:
+                contribution.gender = gender
+            if follower_count is not None and follower_count > 0:
+                contribution.follower_count = follower_count
+            if following_count is not None and following_count > 0:
+                contribution.following_count = following_count
+            if age_range is not None and age_range > 0:
+                contribution.age_range = age_range
+            if fans_club_level is not None and fans_club_level > 0:
+                contribution.fans_club_level = fans_club_level
+            contribution.updated_at = get_china_now()
+        else:
+            contribution = UserContribution(
+                live_id=live_id,
+                anchor_name=anchor_name,
+                user_id=user_id,
+                user_name=user_name,
+                total_score=gift_value,
+                gift_count=gift_count,
+                chat_count=chat_count,
+                user_avatar=user_avatar,
+                gender=gender if gender and gender > 0 else None,
+                follower_count=follower_count if follower_count and follower_count > 0 else None,
+                following_count=following_count if following_count and following_count > 0 else None,
+                age_range=age_range if age_range and age_range > 0 else None,
+                fans_club_level=fans_club_level if fans_club_level and fans_club_level > 0 else 0
+            )
+            session.add(contribution)
+        return contribution
+
     def get_top_contributors(self, live_id: str, limit: int = 100) -> List[UserContribution]:
         """获取贡献榜TOP N"""
         session = self.get_session()
@@ -827,6 +907,14 @@ class DataService:
         finally:
             session.close()
 
+    def get_live_session(self, session_id: int) -> Optional[LiveSession]:
+        """按 ID 获取直播场次"""
+        session = self.get_session()
+        try:
+            return session.query(LiveSession).filter(LiveSession.id == session_id).first()
+        finally:
+            session.close()
+
     def end_live_session(self, session_id: int, peak_viewer_count: int = None) -> bool:
         """结束直播场次"""
         session = self.get_session()
@@ -909,6 +997,70 @@ class DataService:
         finally:
             session.close()
 
+    def bulk_save_messages(self, chat_rows: List[Dict] = None, gift_rows: List[Dict] = None,
+                           session_deltas: Dict[int, List] = None) -> bool:
+        """
+        批量写入弹幕/礼物消息，并合并更新场次统计（一次事务）
+        :param chat_rows: ChatMessage 字段字典列表
+        :param gift_rows: GiftMessage 字段字典列表
+        :param session_deltas: {session_id: [income_delta, gift_count_delta, chat_count_delta]}
+        :return: 是否整批写入成功
+        """
+        chat_rows = chat_rows or []
+        gift_rows = gift_rows or []
+        session_deltas = session_deltas or {}
+        session = self.get_session()
+        try:
+            if chat_rows:
+                session.bulk_insert_mappings(ChatMessage, chat_rows)
+            if gift_rows:
+                session.bulk_insert_mappings(GiftMessage, gift_rows)
+            self._apply_session_deltas(session, session_deltas)
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"批量写入消息失败，改为逐条写入: {e}")
+        finally:
+            session.close()
+
+        # 整批失败（如 trace_id 唯一约束冲突）时逐条写入，只丢弃出错的那一条
+        session = self.get_session()
+        try:
+            for model, rows in ((ChatMessage, chat_rows), (GiftMessage, gift_rows)):
+                for row in rows:
+                    try:
+                        session.add(model(**row))
+                        session.commit()
+                    except Exception as e:
+                        session.rollback()
+                        logger.error(f"保存{model.__tablename__}消息失败: {e}")
+            try:
+                self._apply_session_deltas(session, session_deltas)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"增量更新直播场次统计失败: {e}")
+            return False
+        finally:
+            session.close()
+
+    @staticmethod
+    def _apply_session_deltas(session, session_deltas: Dict[int, List]):
+        """对每个场次执行一条累加 UPDATE"""
+        now = get_china_now()
+        for session_id, (income_delta, gift_count_delta, chat_count_delta) in session_deltas.items():
+            session.execute(
+                update(LiveSession)
+                .where(LiveSession.id == session_id)
+                .values(
+                    total_income=LiveSession.total_income + income_delta,
+                    total_gift_count=LiveSession.total_gift_count + gift_count_delta,
+                    total_chat_count=LiveSession.total_chat_count + chat_count_delta,
+                    updated_at=now
+                )
+            )
+
     def get_live_sessions(self, live_id: str = None, status: str = None, limit: int = 100) -> List[LiveSession]:
         """获取直播场次列表"""
         session = self.get_session()
@@ -2,6 +2,7 @@
 多房间管理器
 管理所有监控房间的生命周期
 """
+import bisect
 import threading
 import time
 from typing import Dict, Optional
@@ -31,6 +32,10 @@ class MonitoredRoom:
         self.manager = manager
         self.socketio = socketio
 
+        # Socket.IO 房间名 / 统计事件名（消息事件名与房间名相同）
+        self.room_channel = f'room_{live_id}'
+        self.stats_channel = f'room_{live_id}_stats'
+
         self.fetcher = None  # WebDouyinLiveFetcher实例
         self.thread = None  # 监控线程
         self.shutdown_event = threading.Event()  # 关闭事件
@@ -50,10 +55,15 @@ class MonitoredRoom:
             'total_user_count': 0
         }
 
-        # 贡献榜和送礼用户缓存
+        # 贡献榜缓存（条目上的 is_gift 标记该用户本场是否送过礼）
         self.user_contributions = {}
-        self.gift_users = set()
-        self.combo_gifts = {}
+        # 贡献榜有序索引：score > 0 的用户按 (-score, seq, user_id) 升序排列，随 update_contribution 增量维护，
+        # 取榜时直接切片，不再对全部用户排序
+        self._rank_keys = []
+        # 用户首次进入 user_contributions 的序号：分数相同时按进入先后排序（与按字典顺序稳定排序一致）
+        self._contribution_seq = {}
+        self.combo_gifts = {}  # 连击状态，键为 (group_id, user_id, gift_id)
+        self.rank_dirty = True  # 贡献榜自上次推送后是否有变化
 
         logger.info(f"创建监控房间实例: live_id={live_id}")
 
@@ -410,40 +420,37 @@ class MonitoredRoom:
                 logger.info(f"[{self.live_id}] 结束直播场次: session_id={session_id}, 原因={reason}")
 
                 # 重新查询获取最新的场次数据
-                from models.database import LiveSession
-                db_session = data_service.get_session()
-                try:
-                    session = db_session.query(LiveSession).filter(LiveSession.id == session_id).first()
-                    if session:
-                        current_session_data = {
-                            'id': session.id,
-                            'start_time': session.start_time.isoformat() if session.start_time else None,
-                            'end_time': session.end_time.isoformat() if session.end_time else None,
-                            'status': session.status,
-                            'total_income': session.total_income,
-                            'total_gift_count': session.total_gift_count,
-                            'total_chat_count': session.total_chat_count,
-                            'peak_viewer_count': session.peak_viewer_count
-                        }
-
-                        # 推送状态更新给前端
-                        if self.socketio:
-                            # 获取最新房间状态
-                            room = self.manager.data_service.get_live_room(self.live_id)
-                            room_status = room.status if room else None
-
-                            self.socketio.emit(f'room_{self.live_id}_stats', {
-                                'room_status': room_status,  # 新增：监控状态
-                                'current_user_count': self.stats['current_user_count'],
-                                'total_user_count': self.stats['total_user_count'],
-                                'total_income': self.stats['total_income'],
-                                'contributor_count': self.stats['contributor_count'],
-                                'contributor_info': [],
-                                'current_session': current_session_data
-                            }, room=f'room_{self.live_id}')
-                            logger.info(f"[{self.live_id}] 推送直播结束状态更新: session_id={session.id}, status={session.status}")
-                finally:
-                    db_session.close()
+                session = data_service.get_live_session(session_id)
+                if session:
+                    current_session_data = {
+                        'id': session.id,
+                        'start_time': session.start_time.isoformat() if session.start_time else None,
+                        'end_time': session.end_time.isoformat() if session.end_time else None,
+                        'status': session.status,
+                        'total_income': session.total_income,
+                        'total_gift_count': session.total_gift_count,
+                        'total_chat_count': session.total_chat_count,
+                        'peak_viewer_count': session.peak_viewer_count
+                    }
+
+                    # 推送状态更新给前端
+                    if self.socketio:
+                        # 获取最新房间状态
+                        room = self.manager.data_service.get_live_room(self.live_id)
+                        room_status = room.status if room else None
+
+                        self.socketio.emit(self.stats_channel, {
+                            'room_status': room_status,  # 新增：监控状态
+                            'current_user_count': self.stats['current_user_count'],
+                            'total_user_count': self.stats['total_user_count'],
+                            'total_income': self.stats['total_income'],
+                            'contributor_count': self.stats['contributor_count'],
+                            'contributor_info': [],
+                            'current_session': current_session_data
+                        }, room=self.room_channel)
+                        # 前端榜单已被清空，下一次统计推送需要重新下发
+                        self.rank_dirty = True
+                        logger.info(f"[{self.live_id}] 推送直播结束状态更新: session_id={session.id}, status={session.status}")
                 return True
             else:
                 logger.warning(f"[{self.live_id}] 结束直播场次失败: session_id={session_id}")
@@ -472,13 +479,22 @@ class MonitoredRoom:
             return self.end_current_session(reason=f"连续{OFFLINE_THRESHOLD}次未开播: {reason}")
         return False
 
-    def update_contribution(self, user_id: str, user_name: str, gift_value: float = 0,
+    def update_contribution(self, user_id: str, user_name: str, is_gift: bool = False, gift_value: float = 0,
                            gift_count: int = 0, chat_count: int = 0, user_avatar: str = None,
                            gender: int = None, follower_count: int = None,
                            following_count: int = None, age_range: int = None,
-                           fans_club_level: int = None, user_level: int = None):
-        """更新用户贡献"""
+                           fans_club_level: int = None, user_level: int = None, persist: bool = True):
+        """
+        更新用户贡献
+        :param is_gift: 本次更新是否来自礼物消息（用于标记送礼用户）
+        :param persist: 是否同步写入数据库；为 False 时只更新本地缓存，由调用方负责落库
+        """
+        # 送礼或已上榜用户的信息变化会影响贡献榜，纯弹幕用户不影响
+        old_score = self.user_contributions.get(user_id, {}).get('score', 0)
+        if gift_value > 0 or old_score > 0:
+            self.rank_dirty = True
         if user_id not in self.user_contributions:
+            self._contribution_seq[user_id] = len(self._contribution_seq)
             self.user_contributions[user_id] = {
                 'user_name': user_name,
                 'score': 0,
@@ -503,9 +519,16 @@ class MonitoredRoom:
                 logger.debug(f"[更新用户信息] {user_id}: {old_name} -> {user_name}, avatar: {old_avatar} -> {user_avatar}")
 
         self.user_contributions[user_id]['score'] += gift_value
+        if is_gift:
+            self.user_contributions[user_id]['is_gift'] = True
         self.user_contributions[user_id]['gift_count'] = self.user_contributions[user_id].get('gift_count', 0) + gift_count
+        if gift_value:
+            self._move_rank_key(user_id, old_score, self.user_contributions[user_id]['score'])
         logger.debug(f"[更新贡献] {user_id}={user_name}, score={self.user_contributions[user_id]['score']}, gift_count={self.user_contributions[user_id]['gift_count']}")
 
+        if not persist:
+            return
+
         # 同步到数据库
         self.manager.data_service.update_user_contribution(
             self.live_id,
@@ -522,27 +545,60 @@ class MonitoredRoom:
             fans_club_level=fans_club_level
         )
 
+    def _move_rank_key(self, user_id: str, old_score, new_score):
+        """在有序索引中把用户从旧分数位置移到新分数位置（分数 <= 0 的用户不在索引中）"""
+        rank_keys = self._rank_keys
+        seq = self._contribution_seq[user_id]
+        if old_score > 0:
+            old_key = (-old_score, seq, user_id)
+            i = bisect.bisect_left(rank_keys, old_key)
+            if i < len(rank_keys) and rank_keys[i] == old_key:
+                del rank_keys[i]
+        if new_score > 0:
+            bisect.insort(rank_keys, (-new_score, seq, user_id))
+
+    def load_contributions(self, contributions: Dict[str, Dict]):
+        """批量合并贡献数据到本地缓存（如从数据库预加载），并重建贡献榜索引"""
+        for entry in contributions.values():
+            # 数据库中的贡献值只来自礼物，与内存中 update_contribution(is_gift=True) 的条目保持一致
+            if entry.get('score', 0) > 0 or entry.get('gift_count', 0) > 0:
+                entry['is_gift'] = True
+        contribution_seq = self._contribution_seq
+        for user_id in contributions:
+            if user_id not in contribution_seq:
+                contribution_seq[user_id] = len(contribution_seq)
+        self.user_contributions.update(contributions)
+        self._rank_keys = sorted(
+            (-v['score'], contribution_seq[k], k) for k, v in self.user_contributions.items() if v['score'] > 0
+        )
+        self.rank_dirty = True
+
+    def clear_contributions(self):
+        """清空本地贡献榜缓存（新场次）"""
+        self.user_contributions.clear()
+        self._contribution_seq.clear()
+        self._rank_keys = []
+        self.rank_dirty = True
+
+    def get_contributor_count(self) -> int:
+        """送过礼物（score > 0）的用户数量"""
+        return len(self._rank_keys)
+
     def get_contribution_rank(self, limit: int = 100) -> list:
         """获取贡献排行榜（只显示送过礼物的用户）"""
-        rank_list = sorted(
-            [
-                {
-                    'user_id': k,
-                    'user': v['user_name'],
-                    'score': v['score'],
-                    'avatar': v['avatar'],
-                    'fans_club_level': v.get('fans_club_level', 0),
-                    'user_level': v.get('user_level', 0)
-                }
-                for k, v in self.user_contributions.items()
-                if v['score'] > 0  # 只包含贡献值大于0的用户（送过礼物的）
-            ],
-            key=lambda x: x['score'],
-            reverse=True
-        )[:limit]
-
-        for i, item in enumerate(rank_list):
-            item['rank'] = i + 1
+        rank_list = []
+        contributions = self.user_contributions
+        for i, (_, _, user_id) in enumerate(self._rank_keys[:limit]):
+            v = contributions[user_id]
+            rank_list.append({
+                'user_id': user_id,
+                'user': v['user_name'],
+                'score': v['score'],
+                'avatar': v['avatar'],
+                'fans_club_level': v.get('fans_club_level', 0),
+                'user_level': v.get('user_level', 0),
+                'rank': i + 1
+            })
 
         # 记录贡献榜数据用于调试
         if rank_list:
@@ -565,6 +621,9 @@ class RoomManager:
         self.socketio = socketio
         self.active_rooms: Dict[str, MonitoredRoom] = {}  # live_id -> MonitoredRoom
         self.lock = threading.Lock()
+        # 房间增删/启停时置位，用于唤醒终端状态面板；与 DataService.room_changed 共用同一个事件，
+        # 监控线程更新直播间状态（monitoring/offline/error 等）时同样会唤醒面板
+        self.state_changed = data_service.room_changed
 
         # 启动时清理状态不一致的房间
         self._cleanup_stale_statuses()
@@ -649,6 +708,7 @@ class RoomManager:
             )
 
             self.active_rooms[live_id] = monitored_room
+            self.state_changed.set()
             logger.info(f"添加监控房间: live_id={live_id}")
             return live_id
 
@@ -666,6 +726,7 @@ class RoomManager:
             monitored_room = self.active_rooms[live_id]
             monitored_room.stop()
             del self.active_rooms[live_id]
+            self.state_changed.set()
             logger.info(f"移除监控房间: live_id={live_id}")
             return True
 
@@ -719,6 +780,7 @@ class RoomManager:
             self.data_service.update_live_room(live_id, auto_reconnect=True)
 
             monitored_room.start()
+            self.state_changed.set()
             return True
 
     def stop_room(self, live_id: str) -> bool:
@@ -746,6 +808,7 @@ class RoomManager:
 
             monitored_room.stop()
             del self.active_rooms[live_id]
+            self.state_changed.set()
             return True
 
     def restart_failed_rooms(self) -> int:
@@ -772,6 +835,9 @@ class RoomManager:
                     restarted += 1
                     logger.info(f"重启失败的房间: live_id={live_id}")
 
+            if restarted:
+                self.state_changed.set()
+
         return restarted
 
     def get_all_rooms_status(self) -> list:
@@ -803,31 +869,5 @@ class RoomManager:
                     logger.error(f"关闭房间 {live_id} 时出错: {e}")
 
             self.active_rooms.clear()
+            self.state_changed.set()
             logger.info("所有监控房间已关闭")
-
-    def get_display_status(self) -> list:
-        """
-        获取所有房间的状态摘要（供终端状态面板调用）
-        :return: 房间状态列表
-        """
-        rows = []
-        try:
-            all_rooms = self.data_service.list_live_rooms()
-            for room in all_rooms:
-                live_id = room.live_id
-                row = {
-                    'anchor_name': room.anchor_name or live_id,
-                    'live_id': live_id,
-                    'status': room.status or 'stopped',
-                    'current_user_count': 0,
-                    'total_income': 0,
-                    'error_message': room.error_message if hasattr(room, 'error_message') else '',
-                }
-                monitored = self.active_rooms.get(live_id)
-                if monitored:
-                    row['current_user_count'] = monitored.stats.get('current_user_count', 0)
-                    row['total_income'] = monitored.stats.get('total_income', 0)
-                rows.append(row)
-        except Exception as e:
-            logger.error(f"获取显示状态失败: {e}")
-        return rows
@@ -258,7 +258,12 @@ const app = new Vue({
             });
 
             this.socket.on(`room_${this.liveId}`, (data) => {
-                this.handleMessage(data);
+                // 服务端会把短时间内的多条弹幕/礼物合并为一个 batch 推送
+                if (data.type === 'batch') {
+                    this.handleMessages(data.items || []);
+                } else {
+                    this.handleMessages([data]);
+                }
             });
 
             this.socket.on(`room_${this.liveId}_stats`, (data) => {
@@ -272,7 +277,10 @@ const app = new Vue({
                     totalUserCount: data.total_user_count || 0,
                     totalIncome: data.total_income || 0,
                     contributorCount: data.contributor_count || 0,
-                    contributorInfo: data.contributor_info || []
+                    // 贡献榜无变化时服务端不下发 contributor_info，沿用上一次的榜单
+                    contributorInfo: data.contributor_info !== undefined
+                        ? (data.contributor_info || [])
+                        : this.stats.contributorInfo
                 };
 
                 // 实时更新当前场次数据 - 只有正在直播的才显示
@@ -284,13 +292,16 @@ const app = new Vue({
                 }
             });
         },
-        handleMessage(data) {
+        handleMessages(items) {
+            if (!items.length) return;
+
             // 添加到消息列表（新消息在末尾）
-            this.messages.push({
+            const timestamp = new Date();
+            this.messages.push(...items.map(data => ({
                 ...data,
                 user_id: data.user_id || null,
-                timestamp: new Date()
-            });
+                timestamp
+            })));
 
             // 智能滚动：只有当用户在底部时才自动滚动
             this.$nextTick(() => {
@@ -299,7 +310,7 @@ const app = new Vue({
                     if (this.isAtBottom) {
                         container.scrollTop = container.scrollHeight;
                     } else {
-                        this.unreadCount++;
+                        this.unreadCount += items.length;
                     }
                 }
             });
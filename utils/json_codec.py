@@ -0,0 +1,27 @@
+"""
+Socket.IO 使用的 JSON 编解码模块
+安装了 orjson 时用它序列化推送数据，未安装或遇到 orjson 不支持的数据时回退到标准库 json
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def dumps(obj, **kwargs):
+    """序列化为 JSON 字符串（兼容 json.dumps 的调用方式）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj, **kwargs)
+
+
+def loads(s, **kwargs):
+    """解析 JSON 字符串（兼容 json.loads 的调用方式）"""
+    if orjson is not None and not kwargs:
+        return orjson.loads(s)
+    return json.loads(s, **kwargs)
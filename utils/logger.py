@@ -11,7 +11,6 @@ WARNING/ERROR 消息会渲染在状态面板上方，不会破坏面板布局。
 import sys
 from pathlib import Path
 from loguru import logger
-from rich.text import Text
 
 import config
 
@@ -29,15 +28,6 @@ def set_console(console):
 
 
 # 日志格式定义
-# 控制台格式（带颜色，用于 loguru colorize）
-CONSOLE_FORMAT = (
-    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-    "<level>{level: <7}</level> | "
-    "<cyan>[{extra[room_id]}]</cyan> "
-    "<blue>{extra[module]}</blue> | "
-    "<level>{message}</level>"
-)
-
 # 纯文本控制台格式（用于 rich Console 路由时，不含 loguru 颜色标签）
 CONSOLE_PLAIN_FORMAT = (
     "{time:YYYY-MM-DD HH:mm:ss} | "
@@ -73,15 +63,16 @@ def _console_sink(message):
     自定义 loguru sink：通过 rich Console 输出日志。
     当 rich.Live 处于活跃状态时，console.print() 会自动将输出渲染到面板上方。
     当 Console 未设置时，回退到 sys.stderr。
+
+    message 本身已是格式化好的字符串（str 子类），直接交给 console.print，
+    不再构造 rich.Text；关闭 markup/emoji/highlight，既跳过 rich 的正则扫描，
+    也避免日志里的 :name: 文本（如用户名、弹幕内容）被替换成 emoji。
     """
     if _console is not None:
-        record = message.record
-        level_name = record['level'].name
-        style = _LEVEL_STYLES.get(level_name, '')
-        text = str(message).rstrip('\n')
-        _console.print(Text(text, style=style))
+        style = _LEVEL_STYLES.get(message.record['level'].name, '')
+        _console.print(message, style=style, markup=False, emoji=False, highlight=False, end='')
     else:
-        sys.stderr.write(str(message))
+        sys.stderr.write(message)
 
 
 def setup_logger():
@@ -101,13 +92,17 @@ def setup_logger():
         filter=lambda record: record["extra"].get("room_id") is not None
     )
 
+    # 文件日志使用 enqueue=True 由后台线程写盘，不阻塞消息处理线程；
+    # 轮转阈值放宽到 100 MB 以减少轮转次数，retention 按文件个数保留，
+    # 轮转时无需逐个比较文件修改时间
     # 全局日志文件（所有级别）
     logger.add(
         log_dir / "app_{time:YYYY-MM-DD}.log",
         format=FILE_FORMAT,
         level="DEBUG",
-        rotation="50 MB",
-        retention="30 days",
+        rotation="100 MB",
+        retention=30,
+        enqueue=True,
         encoding="utf-8",
         filter=lambda record: record["extra"].get("room_id") is not None
     )
@@ -117,8 +112,9 @@ def setup_logger():
         log_dir / "error_{time:YYYY-MM-DD}.log",
         format=FILE_FORMAT,
         level="ERROR",
-        rotation="20 MB",
-        retention="30 days",
+        rotation="100 MB",
+        retention=30,
+        enqueue=True,
         encoding="utf-8",
         filter=lambda record: record["extra"].get("room_id") is not None
     )
@@ -7,6 +7,7 @@ Docker 环境下自动禁用 rich 面板，改用定期文本输出
 import os
 import sys
 import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from wcwidth import wcswidth
@@ -42,14 +43,16 @@ if _IS_DOCKER:
     # Docker 环境不使用 rich Console，日志直接输出到 stderr
     console = None
     _RICH_MODE = False
+    # 文本面板整帧编码后直接写入底层字节流
+    _STDERR_BUF = getattr(sys.stderr, 'buffer', None)
 else:
     # 非 Docker 环境，使用 rich
     console = Console(stderr=True)
     _RICH_MODE = True
+    _STDERR_BUF = None
 
 # ANSI 转义码
 ANSI_CLEAR = "\033[2J\033[H"  # 清屏 + 光标移到左上角
-ANSI_EL = "\033[K"  # 清除到行尾
 
 # 状态颜色映射
 STATUS_STYLES = {
@@ -107,16 +110,69 @@ def _pad_to_width(text: str, width: int, align: str = 'center') -> str:
         return ' ' * left_pad + text + ' ' * right_pad
 
 
+# 文本模式列定义：(显示宽度, 对齐方式)，顺序与数据行字段一致
+_TEXT_COLUMNS = (
+    (20, 'center'),  # 主播
+    (15, 'center'),  # live_id
+    (8, 'center'),   # 监控状态
+    (6, 'center'),   # 直播
+    (8, 'center'),   # 在线人数
+    (10, 'center'),  # 收入
+    (30, 'left'),    # 备注
+)
+
+
+def _format_text_row(values) -> str:
+    """按 _TEXT_COLUMNS 定义将一行字段填充并拼接为文本行"""
+    return " | ".join(
+        _pad_to_width(value, width, align)
+        for value, (width, align) in zip(values, _TEXT_COLUMNS)
+    ) + "\n"
+
+
+# 表头与分隔线固定不变，导入时生成一次
+_TEXT_HEADER = " | ".join(
+    _pad_to_width(title, width, 'center')
+    for title, (width, _) in zip(
+        ('主播', 'live_id', '监控状态', '直播', '在线人数', '收入', '备注'),
+        _TEXT_COLUMNS,
+    )
+) + "\n"
+_TEXT_RULE_HEAVY = "=" * 115 + "\n"
+_TEXT_RULE_LIGHT = "-" * 115 + "\n"
+
+
+def _render_rich_row(row: dict) -> tuple:
+    """将一行显示数据（见 StatusDisplay._get_display_data）转换为 rich 表格单元格"""
+    status = row['status']
+    style = STATUS_STYLES.get(status, 'dim')
+    note = row['note']
+
+    return (
+        Text(row['anchor_name'], style=style),
+        Text(row['live_id'], style="dim"),
+        Text(row['status_label'], style=style),
+        Text(row['live_label'], style="green" if status == 'monitoring' else "dim"),
+        Text(row['viewer_str'], style=style),
+        Text(row['income_str'], style=style),
+        Text(note, style="yellow" if note else "dim"),
+    )
+
+
 class StatusDisplay:
     """终端状态面板，Docker 环境使用文本模式，本地环境使用 rich.Live"""
 
-    def __init__(self, room_manager, refresh_interval: float = 5.0):
+    def __init__(self, room_manager, refresh_interval: float = 5.0, max_idle_interval: float = 10.0):
         """
         :param room_manager: RoomManager 实例
         :param refresh_interval: 刷新间隔（秒）
+        :param max_idle_interval: 内容无变化时退避的最大刷新间隔（秒）
         """
         self.room_manager = room_manager
         self.refresh_interval = refresh_interval
+        self.max_idle_interval = max(max_idle_interval, refresh_interval)
+        self._last_signature = None  # 上一次显示内容，用于判断是否变化
+        self._idle_cycles = 0  # 连续无变化的刷新次数
         self._thread = None
         self._stop_event = threading.Event()
         self._live = None
@@ -126,7 +182,7 @@ class StatusDisplay:
         if _IS_DOCKER:
             sys.stderr.write("[StatusDisplay] Docker 环境检测，使用文本模式输出状态\n")
 
-    def _build_table(self) -> Table:
+    def _build_table(self, display_rows: list) -> Table:
         """构建状态表格"""
         now = datetime.now(CHINA_TZ).strftime('%Y-%m-%d %H:%M:%S')
 
@@ -145,9 +201,6 @@ class StatusDisplay:
         table.add_column("收入", justify="right", min_width=8)
         table.add_column("备注", max_width=24, no_wrap=True)
 
-        # 获取所有房间状态
-        display_rows = self._get_display_data()
-
         if not display_rows:
             table.add_row(
                 Text("暂无监控房间", style="dim italic"),
@@ -155,43 +208,19 @@ class StatusDisplay:
             )
             return table
 
-        for row in display_rows:
-            status = row.get('status', 'stopped')
-            style = STATUS_STYLES.get(status, 'dim')
-            status_label = STATUS_LABELS.get(status, status)
-            live_label = LIVE_STATUS_LABELS.get(status, '未知')
-
-            # 在线人数
-            viewer_count = row.get('current_user_count', 0)
-            if status == 'monitoring' and viewer_count > 0:
-                viewer_str = f"{viewer_count:,}"
-            else:
-                viewer_str = "-"
-
-            # 收入
-            total_income = row.get('total_income', 0)
-            if total_income > 0:
-                income_str = f"{total_income:,.0f}"
-            else:
-                income_str = "-"
-
-            # 备注（错误信息等）
-            note = row.get('note', '')
-
-            table.add_row(
-                Text(row.get('anchor_name', '未知'), style=style),
-                Text(row.get('live_id', ''), style="dim"),
-                Text(status_label, style=style),
-                Text(live_label, style="green" if status == 'monitoring' else "dim"),
-                Text(viewer_str, style=style),
-                Text(income_str, style=style),
-                Text(note, style="yellow" if note else "dim"),
-            )
+        rendered_rows = [_render_rich_row(row) for row in display_rows]
+        for cells in rendered_rows:
+            table.add_row(*cells)
 
         return table
 
     def _get_display_data(self) -> list:
-        """获取所有房间的显示数据"""
+        """
+        获取所有房间的显示数据
+
+        返回的每一行都已是可直接渲染的字符串（标签、数字格式化、截断均在此完成），
+        rich 表格和文本模式两条渲染路径直接使用，不再各自重复计算。
+        """
         rows = []
         try:
             data_service = self.room_manager.data_service
@@ -201,125 +230,128 @@ class StatusDisplay:
 
             for room in all_rooms:
                 live_id = room.live_id
-                row = {
-                    'anchor_name': room.anchor_name or live_id,
-                    'live_id': live_id,
-                    'status': room.status or 'stopped',
-                    'current_user_count': 0,
-                    'total_income': 0,
-                    'note': '',
-                }
+                status = room.status or 'stopped'
 
                 # 如果房间在活跃列表中，获取实时统计
+                viewer_count = 0
+                total_income = 0
                 monitored = self.room_manager.active_rooms.get(live_id)
                 if monitored:
-                    row['current_user_count'] = monitored.stats.get('current_user_count', 0)
-                    row['total_income'] = monitored.stats.get('total_income', 0)
+                    viewer_count = monitored.stats.get('current_user_count', 0)
+                    total_income = monitored.stats.get('total_income', 0)
 
                 # 错误信息（首次运行不显示疑似风控）
-                if room.status == 'error' and room.error_message:
-                    row['note'] = room.error_message[:24]
-                elif room.status in ('offline', 'waiting') and room.error_message:
+                note = ''
+                if status == 'error' and room.error_message:
+                    note = room.error_message[:24]
+                elif status in ('offline', 'waiting') and room.error_message:
                     # 首次运行不显示"疑似风控"
                     if self._first_run and "疑似风控" in room.error_message:
-                        row['note'] = "初始化中..."
+                        note = "初始化中..."
                     else:
-                        row['note'] = room.error_message[:24]
-
-                rows.append(row)
+                        note = room.error_message[:24]
+
+                rows.append({
+                    'anchor_name': (room.anchor_name or live_id)[:20],
+                    'live_id': live_id[:15],
+                    'status': status,
+                    'status_label': STATUS_LABELS.get(status, status),
+                    'live_label': LIVE_STATUS_LABELS.get(status, '未知'),
+                    'viewer_str': f"{viewer_count:,}" if status == 'monitoring' and viewer_count > 0 else "-",
+                    'income_str': f"{total_income:,.0f}" if total_income > 0 else "-",
+                    'note': note,
+                })
         except Exception:
             pass
 
         return rows
 
-    def _print_text_status(self):
+    def _print_text_status(self, display_rows: list):
         """文本模式：打印状态列表（Docker 环境使用）"""
-        display_rows = self._get_display_data()
         if not display_rows:
             return
 
         now = datetime.now(CHINA_TZ).strftime('%Y-%m-%d %H:%M:%S')
 
-        # 使用 ANSI 转义码清屏并重绘
-        sys.stderr.write(ANSI_CLEAR)
-        sys.stderr.flush()
-
-        # 标题
-        sys.stderr.write(f"抖音直播监控平台 | 运行中 | {now}\n")
-        sys.stderr.write("=" * 115 + "\n")
-
-        # 表头（使用显示宽度填充）
-        header = (
-            _pad_to_width('主播', 20, 'center') + " | " +
-            _pad_to_width('live_id', 15, 'center') + " | " +
-            _pad_to_width('监控状态', 8, 'center') + " | " +
-            _pad_to_width('直播', 6, 'center') + " | " +
-            _pad_to_width('在线人数', 8, 'center') + " | " +
-            _pad_to_width('收入', 10, 'center') + " | " +
-            _pad_to_width('备注', 30, 'center')
-        )
-        sys.stderr.write(header + "\n")
-        sys.stderr.write("-" * 115 + "\n")
-
-        # 数据行
+        # 整帧拼接后一次性写出：清屏 + 标题 + 表头 + 数据行
+        parts = [
+            ANSI_CLEAR,
+            f"抖音直播监控平台 | 运行中 | {now}\n",
+            _TEXT_RULE_HEAVY,
+            _TEXT_HEADER,
+            _TEXT_RULE_LIGHT,
+        ]
         for row in display_rows:
-            status = row.get('status', 'stopped')
-            status_label = STATUS_LABELS.get(status, status)
-            live_label = LIVE_STATUS_LABELS.get(status, '未知')
-
-            viewer_count = row.get('current_user_count', 0)
-            if status == 'monitoring' and viewer_count > 0:
-                viewer_str = f"{viewer_count:,}"
-            else:
-                viewer_str = "-"
-
-            total_income = row.get('total_income', 0)
-            if total_income > 0:
-                income_str = f"{total_income:,.0f}"
-            else:
-                income_str = "-"
-
-            note = row.get('note', '')
-            anchor = row.get('anchor_name', '未知')
-            live_id = row.get('live_id', '')
-
-            line = (
-                _pad_to_width(anchor, 20, 'center') + " | " +
-                _pad_to_width(live_id, 15, 'center') + " | " +
-                _pad_to_width(status_label, 8, 'center') + " | " +
-                _pad_to_width(live_label, 6, 'center') + " | " +
-                _pad_to_width(viewer_str, 8, 'center') + " | " +
-                _pad_to_width(income_str, 10, 'center') + " | " +
-                _pad_to_width(note, 30, 'left')
-            )
-            sys.stderr.write(line + "\n")
+            parts.append(_format_text_row((
+                row['anchor_name'],
+                row['live_id'],
+                row['status_label'],
+                row['live_label'],
+                row['viewer_str'],
+                row['income_str'],
+                row['note'],
+            )))
+        parts.append(_TEXT_RULE_HEAVY)
+        frame = "".join(parts)
+
+        if _STDERR_BUF is not None:
+            # 先刷出文本层中可能残留的日志，再写入整帧字节
+            sys.stderr.flush()
+            _STDERR_BUF.write(frame.encode("utf-8"))
+            _STDERR_BUF.flush()
+        else:
+            sys.stderr.write(frame)
+            sys.stderr.flush()
+
+    def _wait_next_refresh(self, display_rows: list):
+        """
+        等待下一次刷新
+
+        - 唤醒时间对齐到墙钟的整数倍间隔，让状态刷新与日志刷盘落在同一时刻
+        - 显示内容连续不变时按 2 倍递增刷新间隔（上限 max_idle_interval）
+        - RoomManager.state_changed 被置位（房间增删/启停、直播间状态变化）时立即唤醒并恢复默认间隔
+        """
+        signature = tuple(tuple(row.values()) for row in display_rows)
+        if signature == self._last_signature:
+            self._idle_cycles = min(self._idle_cycles + 1, 8)
+        else:
+            self._idle_cycles = 0
+            self._last_signature = signature
+
+        interval = min(self.max_idle_interval, self.refresh_interval * (2 ** self._idle_cycles))
+        timeout = max(0.1, interval - (time.time() % interval))
 
-        sys.stderr.write("=" * 115 + "\n")
-        sys.stderr.flush()
+        state_changed = self.room_manager.state_changed
+        if state_changed.wait(timeout):
+            state_changed.clear()
+            self._idle_cycles = 0
 
     def _run(self):
         """后台线程：刷新状态显示"""
         if self._rich_mode:
             # Rich 模式：使用 rich.Live 动态刷新
+            # 关闭 rich 自带的定时重绘，只在表格更新后主动刷新一次
             try:
                 with Live(
-                    self._build_table(),
+                    self._build_table(self._get_display_data()),
                     console=console,
-                    refresh_per_second=0.5,
+                    auto_refresh=False,
                     transient=False,
                 ) as live:
                     self._live = live
                     while not self._stop_event.is_set():
-                        live.update(self._build_table())
-                        self._stop_event.wait(self.refresh_interval)
+                        display_rows = self._get_display_data()
+                        live.update(self._build_table(display_rows), refresh=True)
+                        self._wait_next_refresh(display_rows)
                     self._live = None
             except Exception:
                 self._live = None
         else:
             # 文本模式：定期刷新状态（Docker 环境）
             while not self._stop_event.is_set():
-                self._print_text_status()
-                self._stop_event.wait(self.refresh_interval)
+                display_rows = self._get_display_data()
+                self._print_text_status(display_rows)
+                self._wait_next_refresh(display_rows)
                 self._first_run = False  # 首次运行后更新标志
 
     def start(self):
@@ -340,6 +372,8 @@ class StatusDisplay:
     def stop(self):
         """停止状态面板"""
         self._stop_event.set()
+        # 唤醒可能正在退避等待的刷新线程
+        self.room_manager.state_changed.set()
         if self._thread:
             self._thread.join(timeout=3)
             self._thread = None
@@ -2,22 +2,118 @@
 WebSocket处理器
 扩展核心抓取类，添加数据库存储和Socket.IO推送
 """
-import gzip
+import threading
+import time
+import zlib
+from functools import lru_cache
 from typing import TYPE_CHECKING
 
 import websocket
 
+try:
+    # 可选依赖：ISA-L 实现的 zlib 兼容接口，gzip 解压比标准库快 2~4 倍
+    from isal import isal_zlib as _inflate
+except ImportError:
+    _inflate = zlib
+
 if TYPE_CHECKING:
     from services.room_manager import MonitoredRoom
 
-from protobuf.douyin import PushFrame, Response, ChatMessage, GiftMessage, RoomUserSeqMessage, ControlMessage
+from protobuf.douyin_pb2 import ChatMessage, GiftMessage
+from protobuf.wire import (
+    parse_push_frame, parse_response, read_message_method, encode_ack_frame,
+    parse_room_user_seq, parse_control_status,
+)
+from models.database import get_china_now
 from utils.logger import get_logger
 import config
 
+# 数据库批量写入：每 DB_FLUSH_INTERVAL 秒或缓冲区达到 DB_FLUSH_MAX_ROWS 条时落库一次
+DB_FLUSH_INTERVAL = 0.2
+DB_FLUSH_MAX_ROWS = 100
+
+# 场次快照从数据库重新加载的间隔（秒）；期间统计推送使用本地累加的快照
+SESSION_SNAPSHOT_TTL = 30.0
+
+# 统计推送最小间隔（秒）：统计消息每秒会到达多次，间隔内只更新内存数据，不查库、不推送
+STATS_EMIT_INTERVAL = 0.5
+
+# 前端订阅者检查间隔（秒）：无人订阅时跳过 HTML 构建和推送，只保留入库与统计
+SUBSCRIBER_CHECK_INTERVAL = 1.0
+
+# trace_id 去重集合每一代的容量
+TRACE_ID_GENERATION_SIZE = 1000
+
+# 格式化数字的单位倍率
+_SUFFIX_MULT = {'万': 10000, '亿': 100_000_000}
+
+# ACK 帧的 WebSocket 操作码（模块加载时取一次，省去每帧的属性链查找）
+_OPCODE_BINARY = websocket.ABNF.OPCODE_BINARY
+
+# zlib 的 gzip 格式窗口参数：直接在 C 层解析 gzip 头，省去 gzip 模块的 Python 层头部处理（isal_zlib 同样适用）
+_GZIP_WBITS = 31
+
+
+def _level_img_tag(level):
+    """生成用户等级图标 HTML，等级为 0 时返回空串"""
+    return f'<img src="/level_img/level_{level}.png" class="user-level-icon" alt="等级">' if level else ''
+
+
+def _fansclub_img_tag(level):
+    """生成粉丝团等级图标 HTML，未加入粉丝团（等级 <= 0）时返回空串"""
+    return f'<img src="/fansclub_img/fansclub_{level}.png" class="fans-club-icon" alt="粉丝团">' if level > 0 else ''
+
+
+# 常见等级的图标 HTML 预先生成，热路径上直接按下标取用
+_LEVEL_IMG_COUNT = 128
+_LEVEL_IMG = tuple(_level_img_tag(lv) for lv in range(_LEVEL_IMG_COUNT))
+_FANSCLUB_IMG_COUNT = 64
+_FANSCLUB_IMG = tuple(_fansclub_img_tag(lv) for lv in range(_FANSCLUB_IMG_COUNT))
+
+
+def _user_badges(level, fans_club_level):
+    """用户等级图标 + 粉丝团图标 HTML，超出预生成范围时现场生成"""
+    level_img = _LEVEL_IMG[level] if 0 <= level < _LEVEL_IMG_COUNT else _level_img_tag(level)
+    fansclub_img = _FANSCLUB_IMG[fans_club_level] if 0 <= fans_club_level < _FANSCLUB_IMG_COUNT else _fansclub_img_tag(fans_club_level)
+    return level_img + fansclub_img
+
+
+# 匿名用户的特征 ID（如 111111、0），这类用户改用"用户名_等级"组合作为 user_id
+_ANON_RAW_IDS = frozenset(('0', '111111'))
 
+
+@lru_cache(maxsize=512)
+def _anon_user_id(user, level):
+    """匿名用户的 user_id（同一用户往往连续发送多条消息，结果按 (用户名, 等级) 缓存）"""
+    return f"anon_{user}_{level}"
+
+
+def _resolve_user_id(raw_id, user, level):
+    """把消息中的原始用户 ID 解析为入库/推送使用的 user_id"""
+    if raw_id in _ANON_RAW_IDS:
+        return _anon_user_id(user, level)
+    return raw_id
+
+
+def _session_to_dict(session):
+    """将 LiveSession 转为推送给前端的场次数据"""
+    return {
+        'id': session.id,
+        'start_time': session.start_time.isoformat() if session.start_time else None,
+        'end_time': session.end_time.isoformat() if session.end_time else None,
+        'status': session.status,
+        'total_income': session.total_income,
+        'total_gift_count': session.total_gift_count,
+        'total_chat_count': session.total_chat_count,
+        'peak_viewer_count': session.peak_viewer_count
+    }
+
+
+@lru_cache(maxsize=256)
 def parse_formatted_number(value):
     """
     解析抖音返回的格式化数字（如 '46.8万', '1.2亿'）转换为整数
+    累计观看人数在相邻统计帧之间大多不变（格式化后精度只到千/百万级），结果按输入缓存
     """
     if value is None:
         return 0
@@ -28,35 +124,32 @@ def parse_formatted_number(value):
     if not value_str:
         return 0
 
-    # 处理带"万"的数字
-    if '万' in value_str:
-        num_str = value_str.replace('万', '').strip()
-        try:
-            return int(float(num_str) * 10000)
-        except ValueError:
-            return 0
-
-    # 处理带"亿"的数字
-    if '亿' in value_str:
-        num_str = value_str.replace('亿', '').strip()
-        try:
-            return int(float(num_str) * 100000000)
-        except ValueError:
-            return 0
-
-    # 直接解析数字
+    # 只看末尾字符判断单位（万/亿），避免多次子串扫描和 replace
+    mult = _SUFFIX_MULT.get(value_str[-1])
     try:
-        return int(value_str)
+        return int(float(value_str[:-1]) * mult) if mult else int(value_str)
     except ValueError:
         return 0
 
-
 class WebDouyinLiveFetcher:
     """
     扩展核心抓取类，添加数据库存储和Socket.IO推送
     保持与原有WebDouyinLiveFetcher的兼容性
     """
 
+    # 每个监控房间一个实例、每条消息访问数十次属性：用 __slots__ 去掉实例 __dict__
+    # （新增实例属性时需同步加入此列表）
+    __slots__ = (
+        'live_id', 'db', 'monitored_room', 'socketio', '_data_service',
+        '_room_channel', '_stats_channel',
+        'proxy_enabled', 'proxy_url', 'log', '_fetcher', '_dispatch',
+        'traceId_set', 'traceId_prev_set', 'total_income', 'current_session_id',
+        '_session_snapshot', '_session_snapshot_at', 'current_viewer_count', 'max_viewer_count', 'anchor_name',
+        '_emit_buffer', '_pending_stats', '_flush_stop',
+        '_frame_lock', '_db_lock', '_flush_lock', '_pending_rows', '_session_deltas', '_pending_contributions', '_pending_peaks', '_frame_deltas',
+        '_db_flush_wake', '_subscribers_checked_at', '_subscribers_cached', '_stats_emitted_at',
+    )
+
     def __init__(self, live_id: str, db_session, socketio_instance, monitored_room: 'MonitoredRoom',
                  proxy_enabled=None, proxy_url=None):
         """
@@ -74,6 +167,11 @@ class WebDouyinLiveFetcher:
         self.db = db_session
         self.monitored_room = monitored_room
         self.socketio = socketio_instance
+        self._data_service = monitored_room.manager.data_service
+
+        # Socket.IO 事件/房间名：每次推送都会用到，直接复用房间实例上预先生成的字符串
+        self._room_channel = monitored_room.room_channel
+        self._stats_channel = monitored_room.stats_channel
 
         # 代理配置
         self.proxy_enabled = proxy_enabled if proxy_enabled is not None else config.PROXY_ENABLED
@@ -92,14 +190,57 @@ class WebDouyinLiveFetcher:
         self._fetcher._wsOnClose = self._wsOnClose
 
         # 本地数据（用于实时推送）
-        self.traceId_list = []
-        self.gift_users = set()
+        # trace_id 去重：两代集合轮换，当前代写满 TRACE_ID_GENERATION_SIZE 条后整体降为上一代，
+        # 旧的上一代直接丢弃；查重 O(1)，内存上限为两代容量
+        self.traceId_set = set()
+        self.traceId_prev_set = set()
         self.total_income = 0
         self.current_session_id = None  # 当前直播场次ID
+        self._session_snapshot = None  # 当前场次数据快照（_session_to_dict 格式），随本地增量同步更新
+        self._session_snapshot_at = 0.0
         self.current_viewer_count = 0  # 当前观看人数（用于计算峰值）
         self.max_viewer_count = 0  # 峰值观看人数
         self.anchor_name = None  # 主播名称
 
+        # 弹幕/礼物推送缓冲区：同一个 WebSocket 帧内产生的消息在帧处理结束后合并为一个 batch 推送
+        # （帧处理期间持有 _frame_lock 读写）
+        self._emit_buffer = []
+        self._pending_stats = None  # 本帧待推送的统计数据，在 batch 之后发出，保持与消息的先后顺序
+        self._flush_stop = threading.Event()
+
+        # 数据库写入缓冲区：弹幕/普通礼物行、场次统计增量、用户贡献增量和峰值人数，由后台线程批量落库，
+        # WebSocket 接收线程不再等待数据库往返
+        self._db_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 串行化 _flush_db
+        self._pending_rows = {'chat': [], 'gift': []}
+        self._session_deltas = {}  # {session_id: [income, gift_count, chat_count]}
+        self._pending_contributions = {}  # {user_id: 合并后的贡献增量}
+        self._pending_peaks = {}  # {session_id: 峰值观看人数}
+        # 当前帧内累计的场次统计增量 [income, gift_count, chat_count]，帧处理结束后一次性并入 _session_deltas
+        self._frame_deltas = [0, 0, 0]
+        # 帧处理与结束场次互斥：API 线程（MonitoredRoom.end_current_session）结束场次时，
+        # 不能与正在处理帧的 WebSocket 接收线程同时读写 _frame_deltas / 推送缓冲区；
+        # 可重入，帧内收到 ControlMessage 时在同一线程中结束场次
+        self._frame_lock = threading.RLock()
+        self._db_flush_wake = threading.Event()
+        self._subscribers_checked_at = 0.0
+        self._subscribers_cached = True
+        self._stats_emitted_at = 0.0
+
+        # 消息类型分发表：method -> (解码函数, 处理函数)
+        # 弹幕/礼物用 google protobuf 生成类解码（C 实现的 upb 后端），字段名与 douyin.proto 一致（驼峰）；
+        # 统计/控制消息只用到一两个标量字段，由 protobuf.wire 按字段号直接读取，
+        # 不再构造统计消息里的榜单、座位等嵌套 User 对象；外层 PushFrame/Response 同样由 protobuf.wire 读取
+        # 以 method 原始字节为键：不处理的消息类型在 utf-8 解码和 payload 解析之前就被跳过
+        # 注意：不要为复用而缓存消息实例（Clear() + MergeFromString()），upb 后端的 Clear() 不归还
+        # 消息 arena 中已分配的内存，长时间连接下实例会持续膨胀；每条消息 FromString 新建即可
+        self._dispatch = {
+            b'WebcastChatMessage': (ChatMessage.FromString, self._handle_chat_message),
+            b'WebcastGiftMessage': (GiftMessage.FromString, self._handle_gift_message),
+            b'WebcastRoomUserSeqMessage': (parse_room_user_seq, self._handle_stats_message),
+            b'WebcastControlMessage': (parse_control_status, self._handle_control_message),
+        }
+
         self.log.info(f"初始化WebDouyinLiveFetcher: live_id={live_id}")
 
         # 尝试预加载当前场次数据（在所有实例变量初始化后）
@@ -108,8 +249,7 @@ class WebDouyinLiveFetcher:
     def _preload_session_data(self):
         """预加载当前场次数据"""
         try:
-            data_service = self.monitored_room.manager.data_service
-            current_session = data_service.get_current_live_session(self.live_id)
+            current_session = self._data_service.get_current_live_session(self.live_id)
 
             if current_session:
                 self.current_session_id = current_session.id
@@ -118,21 +258,33 @@ class WebDouyinLiveFetcher:
 
                 # 加载贡献榜
                 if not self.monitored_room.user_contributions:
-                    session_contributors = data_service.get_session_contributors(self.live_id, current_session.id, limit=1000)
-                    for contributor in session_contributors:
-                        self.monitored_room.user_contributions[contributor['user_id']] = {
+                    session_contributors = self._data_service.get_session_contributors(self.live_id, current_session.id, limit=1000)
+                    self.monitored_room.load_contributions({
+                        contributor['user_id']: {
                             'user_name': contributor['nickname'],
                             'score': contributor['contribution_value'],
                             'avatar': contributor['user_avatar'],
                             'gift_count': contributor['gift_count']
                         }
+                        for contributor in session_contributors
+                    })
                     self.log.info(f"预加载了 {len(session_contributors)} 个贡献者到本地缓存")
         except Exception as e:
             self.log.error(f"预加载数据失败: {e}")
 
     def start(self):
-        """启动WebSocket连接"""
-        self._fetcher.start()
+        """启动WebSocket连接（阻塞直到断开）"""
+        self._flush_stop.clear()
+        threading.Thread(target=self._db_flush_loop, daemon=True, name=f"db-{self.live_id}").start()
+        try:
+            self._fetcher.start()
+        finally:
+            self._flush_stop.set()
+            self._db_flush_wake.set()
+            with self._frame_lock:
+                self._flush_emits()
+                self._commit_session_deltas()
+                self._flush_db()
 
     def stop(self):
         """停止WebSocket连接"""
@@ -142,79 +294,250 @@ class WebDouyinLiveFetcher:
         """获取房间状态"""
         return self._fetcher.get_room_status()
 
+    def _has_subscribers(self) -> bool:
+        """当前是否有前端客户端加入了本直播间的 Socket.IO 房间（按间隔采样）"""
+        now = time.monotonic()
+        if now - self._subscribers_checked_at >= SUBSCRIBER_CHECK_INTERVAL:
+            self._subscribers_checked_at = now
+            try:
+                rooms = self.socketio.server.manager.rooms.get('/', {})
+                self._subscribers_cached = bool(rooms.get(self._room_channel))
+            except Exception:
+                # 无法获取房间信息时按有订阅者处理，保证推送不丢
+                self._subscribers_cached = True
+        return self._subscribers_cached
+
+    def _queue_emit(self, message_data: dict, stats: bool = False):
+        """将弹幕/礼物消息放入推送缓冲区；stats=True 时作为本帧的统计推送（同一帧内只保留最新一条）"""
+        if stats:
+            self._pending_stats = message_data
+        else:
+            self._emit_buffer.append(message_data)
+
+    def _flush_emits(self):
+        """把缓冲区中的消息合并为一个 batch 推送到前端，随后推送本帧的统计数据"""
+        if self._emit_buffer:
+            items = self._emit_buffer
+            self._emit_buffer = []
+            self.socketio.emit(self._room_channel, {'type': 'batch', 'items': items}, room=self._room_channel)
+        if self._pending_stats is not None:
+            stats_data = self._pending_stats
+            self._pending_stats = None
+            self.socketio.emit(self._stats_channel, stats_data, room=self._room_channel)
+
+    def _queue_db_row(self, kind: str, **fields):
+        """将一条弹幕（chat）或礼物（gift）记录放入写入缓冲区，自动补充直播间、场次和时间字段"""
+        fields['live_id'] = self.live_id
+        fields['live_session_id'] = self.current_session_id
+        fields['anchor_name'] = self.anchor_name
+        fields['created_at'] = get_china_now()
+        with self._db_lock:
+            rows = self._pending_rows[kind]
+            rows.append(fields)
+            pending = len(rows)
+        if pending >= DB_FLUSH_MAX_ROWS:
+            self._db_flush_wake.set()
+
+    def _add_session_delta(self, income_delta=0, gift_count_delta=0, chat_count_delta=0):
+        """累加当前场次的统计增量（先记在帧内累加器上，由 _commit_session_deltas 合并）"""
+        if not self.current_session_id:
+            return
+        frame_deltas = self._frame_deltas
+        frame_deltas[0] += income_delta
+        frame_deltas[1] += gift_count_delta
+        frame_deltas[2] += chat_count_delta
+
+    def _commit_session_deltas(self):
+        """把帧内累计的增量并入写入缓冲区和场次快照，落库时合并为一条 UPDATE"""
+        income_delta, gift_count_delta, chat_count_delta = self._frame_deltas
+        session_id = self.current_session_id
+        if not (income_delta or gift_count_delta or chat_count_delta):
+            return
+        self._frame_deltas = [0, 0, 0]
+        if not session_id:
+            return
+        with self._db_lock:
+            delta = self._session_deltas.get(session_id)
+            if delta is None:
+                delta = self._session_deltas[session_id] = [0, 0, 0]
+            delta[0] += income_delta
+            delta[1] += gift_count_delta
+            delta[2] += chat_count_delta
+            snapshot = self._session_snapshot
+            if snapshot is not None and snapshot['id'] == session_id:
+                snapshot['total_income'] += income_delta
+                snapshot['total_gift_count'] += gift_count_delta
+                snapshot['total_chat_count'] += chat_count_delta
+
+    def _update_contribution(self, user_id, user_name, is_gift=False, gift_value=0, gift_count=0, chat_count=0,
+                             user_avatar=None, user_level=None, gender=None, follower_count=None,
+                             following_count=None, age_range=None, fans_club_level=None):
+        """更新本地贡献榜，并把对应的数据库更新合并进写入缓冲区"""
+        self.monitored_room.update_contribution(
+            user_id,
+            user_name,
+            is_gift=is_gift,
+            gift_value=gift_value,
+            gift_count=gift_count,
+            chat_count=chat_count,
+            user_avatar=user_avatar,
+            user_level=user_level,
+            gender=gender,
+            follower_count=follower_count,
+            following_count=following_count,
+            age_range=age_range,
+            fans_club_level=fans_club_level,
+            persist=False
+        )
+        with self._db_lock:
+            pending = self._pending_contributions.get(user_id)
+            if pending is None:
+                pending = self._pending_contributions[user_id] = {
+                    'gift_value': 0, 'gift_count': 0, 'chat_count': 0
+                }
+            # 与 MonitoredRoom.update_contribution 的同步写库保持一致：每次调用 gift_count 记 1，不写 chat_count
+            pending['gift_value'] += gift_value
+            pending['gift_count'] += 1
+            pending['user_name'] = user_name
+            anchor_name = getattr(self.monitored_room, 'anchor_name', None)
+            if anchor_name:
+                pending['anchor_name'] = anchor_name
+            if user_avatar:
+                pending['user_avatar'] = user_avatar
+            # 额外信息只在有值时覆盖，合并后与逐条更新的结果相同
+            for key, value in (('gender', gender), ('follower_count', follower_count),
+                               ('following_count', following_count), ('age_range', age_range),
+                               ('fans_club_level', fans_club_level)):
+                if value is not None and value > 0:
+                    pending[key] = value
+
+    def _get_session_snapshot(self):
+        """
+        获取当前场次快照，过期或场次变化时先落库再从数据库重新加载
+
+        重新加载与本地增量一致依赖 _flush_db 的串行化：若后台线程正在写上一批，这里的 _flush_db
+        会等它提交完再写本批，之后读到的场次记录已包含所有已入队的增量
+        （增量只由 WebSocket 接收线程入队，即当前线程，读库期间不会有新增量）
+        """
+        # 同一帧内先前消息的增量先并入快照
+        self._commit_session_deltas()
+        session_id = self.current_session_id
+        if not session_id:
+            return None
+        snapshot = self._session_snapshot
+        now = time.monotonic()
+        if snapshot is None or snapshot['id'] != session_id or now - self._session_snapshot_at >= SESSION_SNAPSHOT_TTL:
+            self._flush_db()
+            session = self._data_service.get_live_session(session_id)
+            snapshot = _session_to_dict(session) if session else None
+            with self._db_lock:
+                self._session_snapshot = snapshot
+            self._session_snapshot_at = now
+        return snapshot
+
+    def _flush_db(self):
+        """
+        把缓冲区中的消息和场次增量批量写入数据库
+
+        后台线程、快照重载和场次结束都会调用；_flush_lock 覆盖“取出缓冲区 + 写库”全过程，
+        保证同一时刻只有一批在写：返回时之前入队的数据都已提交，贡献记录不会被两批并发插入，
+        峰值也按入队顺序写入。_db_lock 只保护缓冲区本身，处理线程入队不受写库阻塞。
+        """
+        with self._flush_lock:
+            with self._db_lock:
+                pending_rows = self._pending_rows
+                session_deltas = self._session_deltas
+                contributions = self._pending_contributions
+                peaks = self._pending_peaks
+                if not (pending_rows['chat'] or pending_rows['gift'] or session_deltas or contributions or peaks):
+                    return
+                self._pending_rows = {'chat': [], 'gift': []}
+                self._session_deltas = {}
+                self._pending_contributions = {}
+                self._pending_peaks = {}
+            if pending_rows['chat'] or pending_rows['gift'] or session_deltas:
+                self._data_service.bulk_save_messages(
+                    pending_rows['chat'], pending_rows['gift'], session_deltas
+                )
+            if contributions:
+                self._data_service.bulk_update_user_contributions(self.live_id, contributions)
+            for session_id, peak in peaks.items():
+                self._data_service.update_session_stats(session_id, peak_viewer_count=peak)
+
+    def _db_flush_loop(self):
+        """后台线程：定期（或缓冲区满时）批量落库"""
+        while not self._flush_stop.is_set():
+            self._db_flush_wake.wait(DB_FLUSH_INTERVAL)
+            self._db_flush_wake.clear()
+            try:
+                self._flush_db()
+            except Exception as e:
+                self.log.error(f"批量写入数据库出错: {e}")
+
     def _wsOnMessage(self, ws, message):
         """处理WebSocket消息（重写原有方法）"""
-        try:
-            package = PushFrame().parse(message)
-            response = Response().parse(gzip.decompress(package.payload))
-
-            # 发送ACK确认
-            if response.need_ack:
-                ack = PushFrame(
-                    log_id=package.log_id,
-                    payload_type='ack',
-                    payload=response.internal_ext.encode('utf-8')
-                ).SerializeToString()
-                ws.send(ack, websocket.ABNF.OPCODE_BINARY)
-
-            # 处理消息列表
-            if response.messages_list:
-                for msg in response.messages_list:
-                    method = msg.method
+        with self._frame_lock:
+            try:
+                # 外层 PushFrame / Response 用轻量读取器解析，只取用到的字段
+                log_id, _, frame_payload = parse_push_frame(message)
+                # 每帧是独立的 gzip 流，一次性 decompress 在 C 层完成解压状态的创建和释放；
+                # 复用 decompressobj 不可行（流结束后不能重置，copy() 的开销与新建相当）
+                data = _inflate.decompress(frame_payload, _GZIP_WBITS)
+                messages, internal_ext, need_ack = parse_response(data)
+
+                # 发送ACK确认
+                if need_ack:
+                    ws.send(encode_ack_frame(log_id, internal_ext), _OPCODE_BINARY)
+
+                # 处理消息列表：先读 method，只有需要处理的消息才解码 payload
+                dispatch = self._dispatch
+                for start, end in messages:
+                    method, span = read_message_method(data, start, end)
+                    entry = dispatch.get(method)
+                    if entry is None:
+                        continue
+                    decode, handler = entry
                     try:
-                        if method == 'WebcastChatMessage':
-                            self._handle_chat_message(ChatMessage().parse(msg.payload))
-                        elif method == 'WebcastGiftMessage':
-                            self._handle_gift_message(GiftMessage().parse(msg.payload))
-                        elif method == 'WebcastRoomUserSeqMessage':
-                            self._handle_stats_message(RoomUserSeqMessage().parse(msg.payload))
-                        elif method == 'WebcastControlMessage':
-                            self._handle_control_message(ControlMessage().parse(msg.payload))
+                        payload = data[span[0]:span[1]] if span else b''
+                        handler(decode(payload))
                     except Exception as e:
-                        self.log.error(f"处理消息出错 [method={method}]: {e}")
-        except Exception as e:
-            self.log.error(f"解析消息出错: {e}")
+                        self.log.error(f"处理消息出错 [method={method.decode('utf-8', 'replace')}]: {e}")
+            except Exception as e:
+                self.log.error(f"解析消息出错: {e}")
+            finally:
+                # 本帧的场次统计增量一次性并入写入缓冲区
+                self._commit_session_deltas()
+                # 本帧产生的弹幕/礼物合并为一次推送，统计数据随后推送
+                try:
+                    self._flush_emits()
+                except Exception as e:
+                    self.log.error(f"推送消息出错: {e}")
 
     def _handle_chat_message(self, chat_msg):
         """处理聊天消息"""
-        user = chat_msg.user.nick_name
+        msg_user = chat_msg.user
+        user = msg_user.nickName
         content = chat_msg.content
-        level = chat_msg.user.pay_grade.level if hasattr(chat_msg.user, 'pay_grade') else 0
-
-        # 处理用户ID：优先使用 id_str，如果 ID 为匿名特征值（如 111111, 0），则使用"用户名_等级"组合
-        raw_id = chat_msg.user.id_str if hasattr(chat_msg.user, 'id_str') and chat_msg.user.id_str else str(chat_msg.user.id)
-        if raw_id in ['0', '111111']:
-            user_id = f"anon_{user}_{level}"
-        else:
-            user_id = raw_id
-
-        # 提取用户额外信息
-        fans_club_level = 0
-        if hasattr(chat_msg.user, 'fans_club') and chat_msg.user.fans_club and chat_msg.user.fans_club.data:
-            fans_club_level = chat_msg.user.fans_club.data.level or 0
-        gender = chat_msg.user.gender if hasattr(chat_msg.user, 'gender') else 0
-        follower_count = 0
-        following_count = 0
-        if hasattr(chat_msg.user, 'follow_info') and chat_msg.user.follow_info:
-            follower_count = chat_msg.user.follow_info.follower_count or 0
-            following_count = chat_msg.user.follow_info.following_count or 0
-        age_range = chat_msg.user.age_range if hasattr(chat_msg.user, 'age_range') else 0
-
-        # 获取data_service（从app全局变量或monitored_room）
-        data_service = self.monitored_room.manager.data_service
-
-        # 构建包含等级图标、粉丝团图标和用户名的消息内容
-        level_img_tag = f'<img src="/level_img/level_{level}.png" class="user-level-icon" alt="等级">' if level else ''
-        fansclub_tag = f'<img src="/fansclub_img/fansclub_{fans_club_level}.png" class="fans-club-icon" alt="粉丝团">' if fans_club_level > 0 else ''
-        message_content_html = f'{level_img_tag}{fansclub_tag} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span>: {content}'
-
-        is_gift_user = user in self.gift_users
-
-        # 保存到数据库
-        data_service.save_chat_message(
-            self.live_id,
-            live_session_id=self.current_session_id,
-            anchor_name=self.anchor_name,
+        level = msg_user.PayGrade.level
+
+        # 处理用户ID：优先使用 id_str，匿名用户使用"用户名_等级"组合
+        user_id = _resolve_user_id(msg_user.idStr or str(msg_user.id), user, level)
+
+        # 提取用户额外信息（protobuf 子消息和字段总是存在，未设置时为默认值 0，直接读取）
+        fans_club_level = msg_user.FansClub.data.level
+        gender = msg_user.gender
+        follow_info = msg_user.FollowInfo
+        follower_count = follow_info.followerCount
+        following_count = follow_info.followingCount
+        age_range = msg_user.ageRange
+
+        # 是否送过礼：直接看贡献榜条目上的标记，不再单独维护送礼用户集合
+        contribution = self.monitored_room.user_contributions.get(user_id)
+        is_gift_user = contribution is not None and contribution.get('is_gift', False)
+
+        # 保存到数据库（进入写入缓冲区，批量落库）
+        self._queue_db_row(
+            'chat',
             user_id=user_id,
             user_name=user,
             user_level=level,
@@ -224,14 +547,10 @@ class WebDouyinLiveFetcher:
         )
 
         # 更新场次弹幕计数
-        if self.current_session_id:
-            data_service.increment_session_stats(
-                self.current_session_id,
-                chat_count_delta=1
-            )
+        self._add_session_delta(chat_count_delta=1)
 
         # 更新贡献表（弹幕计数 + 用户信息）
-        self.monitored_room.update_contribution(
+        self._update_contribution(
             user_id,
             user,
             chat_count=1,
@@ -243,20 +562,23 @@ class WebDouyinLiveFetcher:
             fans_club_level=fans_club_level
         )
 
-        # 通过Socket.IO推送到前端
-        message_data = {
-            'type': 'chat',
-            'user': user,
-            'user_id': user_id,
-            'content': message_content_html,
-            'is_gift_user': is_gift_user,
-            'fans_club_level': fans_club_level,
-            'gender': gender,
-            'follower_count': follower_count,
-            'following_count': following_count,
-            'age_range': age_range,
-        }
-        self.socketio.emit(f'room_{self.live_id}', message_data, room=f'room_{self.live_id}')
+        if self._has_subscribers():
+            # 通过Socket.IO推送到前端（构建包含等级图标、粉丝团图标和用户名的消息内容）
+            badges = _user_badges(level, fans_club_level)
+            message_content_html = f'{badges} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span>: {content}'
+            message_data = {
+                'type': 'chat',
+                'user': user,
+                'user_id': user_id,
+                'content': message_content_html,
+                'is_gift_user': is_gift_user,
+                'fans_club_level': fans_club_level,
+                'gender': gender,
+                'follower_count': follower_count,
+                'following_count': following_count,
+                'age_range': age_range,
+            }
+            self._queue_emit(message_data)
         self.log.debug(f"发送弹幕消息: {user}: {content}")
 
     def _handle_gift_message(self, gift_msg):
@@ -266,12 +588,10 @@ class WebDouyinLiveFetcher:
         1. 使用 trace_id 去重：防止同一消息重复处理
         2. 使用 group_id 组合连击：不依赖 send_type，所有礼物都可能是连击的
         """
-        # 获取data_service
-        data_service = self.monitored_room.manager.data_service
-
-        user = gift_msg.user.nick_name
+        msg_user = gift_msg.user
+        user = msg_user.nickName
         gift_name = gift_msg.gift.name
-        gift_price = gift_msg.gift.diamond_count
+        gift_price = gift_msg.gift.diamondCount
         # 某些礼物的 API 返回价格不准确，按名称修正
         GIFT_PRICE_FIX = {
             '闪烁星河': 99,
@@ -279,64 +599,57 @@ class WebDouyinLiveFetcher:
         }
         if gift_name in GIFT_PRICE_FIX:
             gift_price = GIFT_PRICE_FIX[gift_name]
-        level = gift_msg.user.pay_grade.level if hasattr(gift_msg.user, 'pay_grade') else 0
+        level = msg_user.PayGrade.level
 
-        # 处理用户ID：优先使用 id_str，如果 ID 为匿名特征值（如 111111, 0），则使用"用户名_等级"组合
-        raw_id = gift_msg.user.id_str if hasattr(gift_msg, 'id_str') and gift_msg.user.id_str else str(gift_msg.user.id)
-        if raw_id in ['0', '111111']:
-            user_id = f"anon_{user}_{level}"
-        else:
-            user_id = raw_id
-
-        # 提取用户额外信息
-        fans_club_level = 0
-        if hasattr(gift_msg.user, 'fans_club') and gift_msg.user.fans_club and gift_msg.user.fans_club.data:
-            fans_club_level = gift_msg.user.fans_club.data.level or 0
-        gender = gift_msg.user.gender if hasattr(gift_msg.user, 'gender') else 0
-        follower_count = 0
-        following_count = 0
-        if hasattr(gift_msg.user, 'follow_info') and gift_msg.user.follow_info:
-            follower_count = gift_msg.user.follow_info.follower_count or 0
-            following_count = gift_msg.user.follow_info.following_count or 0
-        age_range = gift_msg.user.age_range if hasattr(gift_msg.user, 'age_range') else 0
+        # 处理用户ID：匿名用户使用"用户名_等级"组合
+        # 注意：礼物消息一直使用数字 user.id（原实现在 gift_msg 而非 user 上探测 id_str，判断恒为假），
+        # 保持不变以免已入库的贡献记录 user_id 对不上
+        user_id = _resolve_user_id(str(msg_user.id), user, level)
+
+        # 提取用户额外信息（protobuf 子消息和字段总是存在，未设置时为默认值 0，直接读取）
+        fans_club_level = msg_user.FansClub.data.level
+        gender = msg_user.gender
+        follow_info = msg_user.FollowInfo
+        follower_count = follow_info.followerCount
+        following_count = follow_info.followingCount
+        age_range = msg_user.ageRange
 
         # 获取 gift_id 和 group_id
-        gift_id_str = str(gift_msg.gift_id) if hasattr(gift_msg, 'gift_id') else None
-        group_id_str = str(gift_msg.group_id) if hasattr(gift_msg, 'group_id') else None
+        gift_id_str = str(gift_msg.giftId)
+        group_id_str = str(gift_msg.groupId)
 
         # 获取用户头像
-        avatar = None
-        if hasattr(gift_msg.user, 'avatar_thumb') and gift_msg.user.avatar_thumb:
-            avatar = gift_msg.user.avatar_thumb.url_list_list[0] if gift_msg.user.avatar_thumb.url_list_list else None
+        url_list = msg_user.AvatarThumb.urlListList
+        avatar = url_list[0] if url_list else None
 
         # ========== 第一步：trace_id 去重 ==========
-        trace_id = getattr(gift_msg, 'trace_id', None) or None
+        trace_id = gift_msg.traceId or None
 
-        if trace_id and trace_id in self.traceId_list:
+        if trace_id and (trace_id in self.traceId_set or trace_id in self.traceId_prev_set):
             self.log.debug(f"礼物消息已处理过（trace_id去重）: trace_id={trace_id}")
             return
 
-        # 记录新的 trace_id
+        # 记录新的 trace_id（当前代写满后轮换，防止内存泄漏）
         if trace_id:
-            self.traceId_list.append(trace_id)
-            # 限制 traceId_list 大小，防止内存泄漏
-            if len(self.traceId_list) > 1000:
-                self.traceId_list = self.traceId_list[-500:]
+            self.traceId_set.add(trace_id)
+            if len(self.traceId_set) >= TRACE_ID_GENERATION_SIZE:
+                self.traceId_prev_set = self.traceId_set
+                self.traceId_set = set()
 
-        self.log.debug(f"[礼物消息] user_id={user_id}, user_name={user}, gift_name={gift_name}, price={gift_price}, send_type={gift_msg.send_type}, group_id={group_id_str}, trace_id={trace_id}")
+        self.log.debug(f"[礼物消息] user_id={user_id}, user_name={user}, gift_name={gift_name}, price={gift_price}, send_type={gift_msg.sendType}, group_id={group_id_str}, trace_id={trace_id}")
 
         # ========== 第二步：使用 group_id 组合连击礼物 ==========
         # 有 group_id 的礼物都可能是连击礼物（不依赖 send_type）
         if group_id_str:
-            combo_key = f"{group_id_str}_{user_id}_{gift_id_str}"
+            combo_key = (group_id_str, user_id, gift_id_str)
 
             # 检查是否有 combo_count（连击计数）
-            current_count = getattr(gift_msg, 'combo_count', None)
+            current_count = gift_msg.comboCount
 
-            if current_count is not None and current_count > 0:
+            if current_count > 0:
                 # ========== 连击礼物：使用 combo_count 跟踪 ==========
                 # 获取每次连击的礼物数量
-                per_combo_count = gift_msg.group_count if hasattr(gift_msg, 'group_count') else 1
+                per_combo_count = gift_msg.groupCount
 
                 # 初始化或获取 combo 状态
                 if combo_key not in self.monitored_room.combo_gifts:
@@ -380,7 +693,7 @@ class WebDouyinLiveFetcher:
                 is_new_record = (db_id is None)
 
                 if is_new_record:
-                    msg = data_service.save_gift_message(
+                    msg = self._data_service.save_gift_message(
                         self.live_id,
                         live_session_id=self.current_session_id,
                         anchor_name=self.anchor_name,
@@ -401,7 +714,7 @@ class WebDouyinLiveFetcher:
                         self.monitored_room.combo_gifts[combo_key]['db_id'] = msg.id
                     self.log.debug(f"连击礼物首次保存: {user} {gift_name}x{gift_count}, db_id={msg.id if msg else None}")
                 else:
-                    data_service.update_gift_message(
+                    self._data_service.update_gift_message(
                         db_id,
                         gift_count=gift_count,
                         total_value=total_gift_value
@@ -424,16 +737,16 @@ class WebDouyinLiveFetcher:
                         f"partial_count={partial_count}"
                     )
                     # 数据库记录已更新（总量是正确的），只跳过增量统计和推送
-                    if gift_msg.repeat_end == 1:
+                    if gift_msg.repeatEnd == 1:
                         del self.monitored_room.combo_gifts[combo_key]
                     return
 
                 self.total_income += partial_value
-                self.gift_users.add(user)
                 self.monitored_room.stats['total_income'] = self.total_income
-                self.monitored_room.update_contribution(
+                self._update_contribution(
                     user_id,
                     user,
+                    is_gift=True,
                     gift_value=partial_value,
                     gift_count=partial_count,
                     user_avatar=avatar,
@@ -446,44 +759,39 @@ class WebDouyinLiveFetcher:
                 )
 
                 # 更新场次统计
-                if self.current_session_id:
-                    data_service.increment_session_stats(
-                        self.current_session_id,
-                        income_delta=partial_value,
-                        gift_count_delta=partial_count
-                    )
-
-                # 推送前端
-                level_img_tag = f'<img src="/level_img/level_{level}.png" class="user-level-icon" alt="等级">' if level else ''
-                fansclub_tag = f'<img src="/fansclub_img/fansclub_{fans_club_level}.png" class="fans-club-icon" alt="粉丝团">' if fans_club_level > 0 else ''
-                if gift_msg.repeat_end == 1:
-                    gift_message_content_html = f'{level_img_tag}{fansclub_tag} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span> 连击完成！赠送了 {gift_count} 个 {gift_name} (价值{total_gift_value}钻石)'
-                    is_combo_end = True
-                else:
-                    gift_message_content_html = f'{level_img_tag}{fansclub_tag} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span> 连击中... {gift_name}x{gift_count} (本次+{partial_count})'
-                    is_combo_end = False
-
-                message_data = {
-                    'type': 'gift',
-                    'user': user,
-                    'user_id': user_id,
-                    'gift_name': gift_name,
-                    'gift_count': partial_count,
-                    'gift_price': gift_price,
-                    'total_value': partial_value,
-                    'content': gift_message_content_html,
-                    'combo_count': current_count,
-                    'is_combo_end': is_combo_end,
-                    'fans_club_level': fans_club_level,
-                    'gender': gender,
-                    'follower_count': follower_count,
-                    'following_count': following_count,
-                    'age_range': age_range,
-                }
-                self.socketio.emit(f'room_{self.live_id}', message_data, room=f'room_{self.live_id}')
+                self._add_session_delta(income_delta=partial_value, gift_count_delta=partial_count)
+
+                if self._has_subscribers():
+                    # 推送前端
+                    badges = _user_badges(level, fans_club_level)
+                    if gift_msg.repeatEnd == 1:
+                        gift_message_content_html = f'{badges} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span> 连击完成！赠送了 {gift_count} 个 {gift_name} (价值{total_gift_value}钻石)'
+                        is_combo_end = True
+                    else:
+                        gift_message_content_html = f'{badges} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span> 连击中... {gift_name}x{gift_count} (本次+{partial_count})'
+                        is_combo_end = False
+
+                    message_data = {
+                        'type': 'gift',
+                        'user': user,
+                        'user_id': user_id,
+                        'gift_name': gift_name,
+                        'gift_count': partial_count,
+                        'gift_price': gift_price,
+                        'total_value': partial_value,
+                        'content': gift_message_content_html,
+                        'combo_count': current_count,
+                        'is_combo_end': is_combo_end,
+                        'fans_club_level': fans_club_level,
+                        'gender': gender,
+                        'follower_count': follower_count,
+                        'following_count': following_count,
+                        'age_range': age_range,
+                    }
+                    self._queue_emit(message_data)
 
                 # 连击结束时清理内存
-                if gift_msg.repeat_end == 1:
+                if gift_msg.repeatEnd == 1:
                     del self.monitored_room.combo_gifts[combo_key]
 
                 return
@@ -502,18 +810,18 @@ class WebDouyinLiveFetcher:
             }
 
             # 连击结束时清理内存
-            if gift_msg.repeat_end == 1:
+            if gift_msg.repeatEnd == 1:
                 self.monitored_room.combo_gifts.pop(combo_key, None)
 
-            gift_count = gift_msg.group_count
+            gift_count = gift_msg.groupCount
             total_gift_value = gift_price * gift_count
 
             self.total_income += total_gift_value
-            self.gift_users.add(user)
             self.monitored_room.stats['total_income'] = self.total_income
-            self.monitored_room.update_contribution(
+            self._update_contribution(
                 user_id,
                 user,
+                is_gift=True,
                 gift_value=total_gift_value,
                 gift_count=gift_count,
                 user_avatar=avatar,
@@ -525,10 +833,8 @@ class WebDouyinLiveFetcher:
                 fans_club_level=fans_club_level
             )
 
-            data_service.save_gift_message(
-                self.live_id,
-                live_session_id=self.current_session_id,
-                anchor_name=self.anchor_name,
+            self._queue_db_row(
+                'gift',
                 user_id=user_id,
                 user_name=user,
                 user_level=level,
@@ -543,47 +849,25 @@ class WebDouyinLiveFetcher:
                 fans_club_level=fans_club_level
             )
 
-            if self.current_session_id:
-                data_service.increment_session_stats(
-                    self.current_session_id,
-                    income_delta=total_gift_value,
-                    gift_count_delta=gift_count
-                )
+            self._add_session_delta(income_delta=total_gift_value, gift_count_delta=gift_count)
 
-            level_img_tag = f'<img src="/level_img/level_{level}.png" class="user-level-icon" alt="等级">' if level else ''
-            fansclub_tag = f'<img src="/fansclub_img/fansclub_{fans_club_level}.png" class="fans-club-icon" alt="粉丝团">' if fans_club_level > 0 else ''
-            gift_message_content_html = f'{level_img_tag}{fansclub_tag} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span> 赠送了 {gift_count} 个 {gift_name} (价值{gift_price}钻石)'
-
-            message_data = {
-                'type': 'gift',
-                'user': user,
-                'user_id': user_id,
-                'gift_name': gift_name,
-                'gift_count': gift_count,
-                'gift_price': gift_price,
-                'total_value': total_gift_value,
-                'content': gift_message_content_html,
-                'fans_club_level': fans_club_level,
-                'gender': gender,
-                'follower_count': follower_count,
-                'following_count': following_count,
-                'age_range': age_range,
-            }
-            self.socketio.emit(f'room_{self.live_id}', message_data, room=f'room_{self.live_id}')
-            self.log.debug(f"发送礼物消息: {user} 送出了 {gift_name}x{gift_count},单价{gift_price},总价值{total_gift_value}")
+            self._emit_normal_gift(
+                user, user_id, level, fans_club_level, gift_name, gift_count, gift_price, total_gift_value,
+                gender, follower_count, following_count, age_range
+            )
             return
 
         # ========== 兜底逻辑：无 group_id 的礼物 ==========
         self.log.debug(f"[礼物消息-兜底] user={user}, gift={gift_name}, 无group_id")
-        gift_count = gift_msg.group_count
+        gift_count = gift_msg.groupCount
         total_gift_value = gift_price * gift_count
 
         self.total_income += total_gift_value
-        self.gift_users.add(user)
         self.monitored_room.stats['total_income'] = self.total_income
-        self.monitored_room.update_contribution(
+        self._update_contribution(
             user_id,
             user,
+            is_gift=True,
             gift_value=total_gift_value,
             gift_count=gift_count,
             user_avatar=avatar,
@@ -595,10 +879,8 @@ class WebDouyinLiveFetcher:
             fans_club_level=fans_club_level
         )
 
-        data_service.save_gift_message(
-            self.live_id,
-            live_session_id=self.current_session_id,
-            anchor_name=self.anchor_name,
+        self._queue_db_row(
+            'gift',
             user_id=user_id,
             user_name=user,
             user_level=level,
@@ -613,39 +895,46 @@ class WebDouyinLiveFetcher:
             fans_club_level=fans_club_level
         )
 
-        if self.current_session_id:
-            data_service.increment_session_stats(
-                self.current_session_id,
-                income_delta=total_gift_value,
-                gift_count_delta=gift_count
-            )
+        self._add_session_delta(income_delta=total_gift_value, gift_count_delta=gift_count)
 
-        level_img_tag = f'<img src="/level_img/level_{level}.png" class="user-level-icon" alt="等级">' if level else ''
-        fansclub_tag = f'<img src="/fansclub_img/fansclub_{fans_club_level}.png" class="fans-club-icon" alt="粉丝团">' if fans_club_level > 0 else ''
-        gift_message_content_html = f'{level_img_tag}{fansclub_tag} <span class="user-highlight" data-user-id="{user_id}" data-user-name="{user}">{user}</span> 赠送了 {gift_count} 个 {gift_name} (价值{gift_price}钻石)'
-
-        message_data = {
-            'type': 'gift',
-            'user': user,
-            'user_id': user_id,
-            'gift_name': gift_name,
-            'gift_count': gift_count,
-            'gift_price': gift_price,
-            'total_value': total_gift_value,
-            'content': gift_message_content_html,
-            'fans_club_level': fans_club_level,
-            'gender': gender,
-            'follower_count': follower_count,
-            'following_count': following_count,
-            'age_range': age_range,
-        }
-        self.socketio.emit(f'room_{self.live_id}', message_data, room=f'room_{self.live_id}')
+        self._emit_normal_gift(
+            user, user_id, level, fans_club_level, gift_name, gift_count, gift_price, total_gift_value,
+            gender, follower_count, following_count, age_range
+        )
+
+    def _emit_normal_gift(self, user, user_id, level, fans_club_level, gift_name, gift_count,
+                          gift_price, total_gift_value, gender, follower_count, following_count, age_range):
+        """推送普通礼物（非连击）消息到前端"""
+        if self._has_subscribers():
+            badges = _user_badges(level, fans_club_level)
+            gift_message_content_html = ''.join((
+                badges,
+                ' <span class="user-highlight" data-user-id="', user_id, '" data-user-name="', user, '">', user,
+                '</span> 赠送了 ', str(gift_count), ' 个 ', gift_name, ' (价值', str(gift_price), '钻石)'
+            ))
+            self._queue_emit({
+                'type': 'gift',
+                'user': user,
+                'user_id': user_id,
+                'gift_name': gift_name,
+                'gift_count': gift_count,
+                'gift_price': gift_price,
+                'total_value': total_gift_value,
+                'content': gift_message_content_html,
+                'fans_club_level': fans_club_level,
+                'gender': gender,
+                'follower_count': follower_count,
+                'following_count': following_count,
+                'age_range': age_range,
+            })
         self.log.debug(f"发送礼物消息: {user} 送出了 {gift_name}x{gift_count},单价{gift_price},总价值{total_gift_value}")
 
-    def _handle_stats_message(self, stats_msg):
-        """处理统计消息"""
-        current = stats_msg.total
-        total = stats_msg.total_pv_for_anchor
+    def _handle_stats_message(self, stats):
+        """
+        处理统计消息
+        :param stats: parse_room_user_seq 的结果 (当前在线人数, 累计观看人数格式化字符串)
+        """
+        current, total = stats
 
         # 更新统计信息
         if current is not None and current >= 0:
@@ -656,13 +945,10 @@ class WebDouyinLiveFetcher:
             # 更新峰值观看人数
             if current > self.max_viewer_count:
                 self.max_viewer_count = current
-                # 同步更新到数据库的场次记录
+                # 峰值写入缓冲区，由后台线程同步到数据库的场次记录
                 if self.current_session_id:
-                    data_service = self.monitored_room.manager.data_service
-                    data_service.update_session_stats(
-                        self.current_session_id,
-                        peak_viewer_count=self.max_viewer_count
-                    )
+                    with self._db_lock:
+                        self._pending_peaks[self.current_session_id] = self.max_viewer_count
 
         if total is not None and total != '':
             # 将格式化的数字（如'46.8万'）转换为整数
@@ -670,85 +956,79 @@ class WebDouyinLiveFetcher:
             self.monitored_room.stats['total_user_count'] = total_numeric
             self.monitored_room.last_stats['total_user_count'] = total_numeric
 
-        # 只统计当前场次送过礼物的用户数量（score > 0）
-        self.monitored_room.stats['contributor_count'] = sum(
-            1 for v in self.monitored_room.user_contributions.values()
-            if v['score'] > 0
-        )
+        # 限制推送频率：峰值等数据已在上面更新，被跳过的这一次由下一次推送带上最新值
+        now = time.monotonic()
+        if now - self._stats_emitted_at < STATS_EMIT_INTERVAL:
+            return
+        self._stats_emitted_at = now
 
-        # 获取贡献榜
-        rank_list = self.monitored_room.get_contribution_rank(100)
+        # 贡献榜有变化时才重新统计并下发，否则省略 contributor_info，前端沿用上一次的榜单
+        rank_list = None
+        if self.monitored_room.rank_dirty:
+            self.monitored_room.rank_dirty = False
+            # 只统计当前场次送过礼物的用户数量（score > 0）
+            self.monitored_room.stats['contributor_count'] = self.monitored_room.get_contributor_count()
+            rank_list = self.monitored_room.get_contribution_rank(100)
 
-        # 获取当前场次数据用于实时推送
+        # 获取当前场次数据用于实时推送（使用本地快照，定期与数据库校准）
         current_session_data = None
-        if self.current_session_id:
-            data_service = self.monitored_room.manager.data_service
-            # 从数据库重新获取最新场次数据
-            session = data_service.get_current_live_session(self.live_id)
-            if session:
-                current_session_data = {
-                    'id': session.id,
-                    'start_time': session.start_time.isoformat() if session.start_time else None,
-                    'end_time': session.end_time.isoformat() if session.end_time else None,
-                    'status': session.status,
-                    'total_income': session.total_income,
-                    'total_gift_count': session.total_gift_count,
-                    'total_chat_count': session.total_chat_count,
-                    'peak_viewer_count': session.peak_viewer_count
-                }
+        snapshot = self._get_session_snapshot()
+        if snapshot:
+            current_session_data = dict(snapshot)
+            current_session_data['peak_viewer_count'] = max(snapshot['peak_viewer_count'] or 0, self.max_viewer_count)
 
         # 获取最新房间状态
-        room = data_service.get_live_room(self.live_id)
+        room = self._data_service.get_live_room(self.live_id)
         room_status = room.status if room else None
 
         # 通过Socket.IO推送到前端
-        self.socketio.emit(f'room_{self.live_id}_stats', {
+        stats_data = {
             'room_status': room_status,  # 新增：监控状态
             'current_user_count': self.monitored_room.stats['current_user_count'],
             'total_user_count': self.monitored_room.stats['total_user_count'],
             'total_income': self.monitored_room.stats['total_income'],
             'contributor_count': self.monitored_room.stats['contributor_count'],
-            'contributor_info': rank_list,
             'current_session': current_session_data
-        }, room=f'room_{self.live_id}')
+        }
+        if rank_list is not None:
+            stats_data['contributor_info'] = rank_list
+        self._queue_emit(stats_data, stats=True)
         self.log.debug(f"发送直播间统计: 当前{current}, 累计{total}, 总收入{self.total_income}, 贡献者数{len(self.monitored_room.user_contributions)}")
 
     def _end_current_session(self, reason: str = "连接关闭"):
-        """安全地结束当前直播场次（如果存在）"""
-        if self.current_session_id:
-            data_service = self.monitored_room.manager.data_service
-            session_id = self.current_session_id
-            success = data_service.end_live_session(
-                session_id,
-                peak_viewer_count=self.max_viewer_count
-            )
-            if success:
-                self.log.info(f"结束直播场次: session_id={session_id}, 峰值观看人数={self.max_viewer_count}, 原因={reason}")
+        """
+        安全地结束当前直播场次（如果存在）
 
-                # 获取刚结束的场次数据，推送给前端
-                from models.database import LiveSession
+        可能由 API 线程调用，持有 _frame_lock 等 WebSocket 接收线程处理完当前帧，再落库并重置场次状态
+        """
+        with self._frame_lock:
+            if self.current_session_id:
+                # 先把缓冲区落库，场次结束时的统计校正才能看到全部礼物记录
+                self._commit_session_deltas()
+                self._flush_db()
+                session_id = self.current_session_id
+                success = self._data_service.end_live_session(
+                    session_id,
+                    peak_viewer_count=self.max_viewer_count
+                )
+                if success:
+                    self.log.info(f"结束直播场次: session_id={session_id}, 峰值观看人数={self.max_viewer_count}, 原因={reason}")
 
-                db_session = data_service.get_session()
-                try:
-                    session = db_session.query(LiveSession).filter(LiveSession.id == session_id).first()
+                    # 本帧排队的统计数据仍带着 live 场次，作废
+                    self._pending_stats = None
+
+                    # 获取刚结束的场次数据，推送给前端
+                    session = self._data_service.get_live_session(session_id)
                     if session:
-                        current_session_data = {
-                            'id': session.id,
-                            'start_time': session.start_time.isoformat() if session.start_time else None,
-                            'end_time': session.end_time.isoformat() if session.end_time else None,
-                            'status': session.status,
-                            'total_income': session.total_income,
-                            'total_gift_count': session.total_gift_count,
-                            'total_chat_count': session.total_chat_count,
-                            'peak_viewer_count': session.peak_viewer_count
-                        }
+                        current_session_data = _session_to_dict(session)
 
                         # 获取最新房间状态
-                        room = data_service.get_live_room(self.live_id)
+                        room = self._data_service.get_live_room(self.live_id)
                         room_status = room.status if room else None
 
-                        # 推送状态更新给前端
-                        self.socketio.emit(f'room_{self.live_id}_stats', {
+                        # 推送状态更新给前端：排在缓冲区中的弹幕/礼物之后立即发出
+                        # （API 线程调用时没有帧结束的推送）
+                        self._queue_emit({
                             'room_status': room_status,  # 新增：监控状态
                             'current_user_count': self.monitored_room.stats['current_user_count'],
                             'total_user_count': self.monitored_room.stats['total_user_count'],
@@ -756,15 +1036,17 @@ class WebDouyinLiveFetcher:
                             'contributor_count': self.monitored_room.stats['contributor_count'],
                             'contributor_info': [],
                             'current_session': current_session_data
-                        }, room=f'room_{self.live_id}')
+                        }, stats=True)
+                        self._flush_emits()
+                        # 前端榜单已被清空，下一次统计推送需要重新下发
+                        self.monitored_room.rank_dirty = True
                         self.log.info(f"推送直播结束状态更新: session_id={session.id}, status={session.status}")
-                finally:
-                    db_session.close()
-            else:
-                self.log.warning(f"结束直播场次失败: session_id={session_id}")
-            self.current_session_id = None
-            return True
-        return False
+                else:
+                    self.log.warning(f"结束直播场次失败: session_id={session_id}")
+                self.current_session_id = None
+                self._session_snapshot = None
+                return True
+            return False
 
     def _wsOnOpen(self, ws):
         """WebSocket连接建立"""
@@ -779,8 +1061,7 @@ class WebDouyinLiveFetcher:
             anchor_info = self._fetcher.anchor_info
             anchor_name = anchor_info.get('anchor_name')
             if anchor_name or anchor_info.get('anchor_id'):
-                data_service = self.monitored_room.manager.data_service
-                data_service.update_live_room(
+                self._data_service.update_live_room(
                     self.live_id,
                     anchor_name=anchor_name,
                     anchor_id=anchor_info.get('anchor_id')
@@ -802,8 +1083,7 @@ class WebDouyinLiveFetcher:
             self.log.warning(f"获取主播信息失败: {e}")
 
         # 检查或创建直播场次
-        data_service = self.monitored_room.manager.data_service
-        current_session = data_service.get_current_live_session(self.live_id)
+        current_session = self._data_service.get_current_live_session(self.live_id)
 
         if current_session:
             # 已有进行中的场次，继续使用
@@ -814,15 +1094,17 @@ class WebDouyinLiveFetcher:
             # 只有在本地缓存为空时才从数据库加载（避免覆盖已存在的实时数据）
             if not self.monitored_room.user_contributions:
                 self.log.info("本地贡献榜为空，从数据库加载")
-                session_contributors = data_service.get_session_contributors(self.live_id, current_session.id, limit=1000)
-                for contributor in session_contributors:
-                    # get_session_contributors 返回的是 Dict，使用字典访问
-                    self.monitored_room.user_contributions[contributor['user_id']] = {
+                session_contributors = self._data_service.get_session_contributors(self.live_id, current_session.id, limit=1000)
+                # get_session_contributors 返回的是 Dict，使用字典访问；一次性批量写入本地缓存
+                self.monitored_room.load_contributions({
+                    contributor['user_id']: {
                         'user_name': contributor['nickname'],
                         'score': contributor['contribution_value'],
                         'avatar': contributor['user_avatar'],
                         'gift_count': contributor['gift_count']
                     }
+                    for contributor in session_contributors
+                })
                 self.log.info(f"从数据库加载了 {len(session_contributors)} 个贡献者到本地缓存")
             else:
                 self.log.info(f"本地已有 {len(self.monitored_room.user_contributions)} 个贡献者，跳过数据库加载")
@@ -830,10 +1112,10 @@ class WebDouyinLiveFetcher:
             # 创建新的直播场次
             # 清空本地贡献榜缓存（新场次）
             old_count = len(self.monitored_room.user_contributions)
-            self.monitored_room.user_contributions.clear()
+            self.monitored_room.clear_contributions()
             self.log.info(f"新直播场次：清空本地贡献榜缓存（清除了{old_count}个用户）")
 
-            new_session = data_service.create_live_session(
+            new_session = self._data_service.create_live_session(
                 self.live_id,
                 anchor_name=self.anchor_name,
                 status='live'
@@ -844,8 +1126,11 @@ class WebDouyinLiveFetcher:
                 self.max_viewer_count = 0
                 self.log.info(f"创建新直播场次: session_id={self.current_session_id}")
 
+        # (重)连接后下一次统计推送从数据库重新加载场次快照
+        self._session_snapshot = None
+
         # 更新直播间状态
-        data_service.update_live_room_status(self.live_id, 'monitoring')
+        self._data_service.update_live_room_status(self.live_id, 'monitoring')
 
     def _wsOnError(self, ws, error):
         """WebSocket错误"""
@@ -856,9 +1141,12 @@ class WebDouyinLiveFetcher:
         else:
             self.log.error(f"WebSocket错误: {error}")
 
-    def _handle_control_message(self, control_msg):
-        """处理控制消息（直播状态变化）"""
-        if control_msg.status == 3:
+    def _handle_control_message(self, status):
+        """
+        处理控制消息（直播状态变化）
+        :param status: parse_control_status 读出的 ControlMessage.status
+        """
+        if status == 3:
             # 直播已结束
             self.log.warning("检测到直播间已结束（收到服务器通知）")
 
@@ -866,8 +1154,7 @@ class WebDouyinLiveFetcher:
             self._end_current_session(reason="收到服务器直播结束通知")
 
             # 更新直播间状态
-            data_service = self.monitored_room.manager.data_service
-            data_service.update_live_room_status(self.live_id, 'stopped')
+            self._data_service.update_live_room_status(self.live_id, 'stopped')
 
             # 停止监控
             self.stop()